@@ -17,6 +17,8 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+import threading
+
 import streamlit as st
 
 from src.repositories.json_repo import JsonProjectRepository
@@ -55,6 +57,12 @@ def init_services():
     # Expose search_service for agent use
     st.session_state.search_service = st.session_state.ai_service.search_service
     
+    if "agent_warm_up_started" not in st.session_state:
+        st.session_state.agent_warm_up_started = True
+        threading.Thread(
+            target=warm_up_agent, args=(st.session_state.search_service,), daemon=True
+        ).start()
+    
     # Initialize i18n
     if "locale" not in st.session_state:
         # Try to load from DB, default to 'zh'
@@ -65,6 +73,15 @@ def init_services():
         st.session_state.i18n = get_i18n(st.session_state.locale)
 
 
+def warm_up_agent(search_service):
+    """Compile the chat agent in the background so the first message doesn't pay for it"""
+    try:
+        from src.services.langgraph_agent_service import LangGraphAgentService
+        LangGraphAgentService.warm_up(search_service=search_service)
+    except Exception as e:
+        print(f"Agent warm-up skipped: {e}")
+
+
 def main():
     """Main function"""
     st.set_page_config(
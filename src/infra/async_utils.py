@@ -0,0 +1,21 @@
+"""
+Helpers for calling coroutines from synchronous code
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from sync code
+
+    Uses asyncio.run when no event loop is running in this thread (CLI,
+    Streamlit script thread); otherwise runs it on a helper thread so an
+    already-running loop isn't re-entered.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
@@ -2,19 +2,49 @@
 LLM Client (LiteLLM + DeepSeek)
 """
 from __future__ import annotations
+from functools import lru_cache
 from typing import List, Dict, Tuple
+import importlib.util
 import os
 
-try:
-    from litellm import completion
-    LITELLM_AVAILABLE = True
-except ImportError:
-    LITELLM_AVAILABLE = False
+# litellm takes about a second to import, so it is only loaded on the
+# first LLM call (see _completion)
+LITELLM_AVAILABLE = importlib.util.find_spec("litellm") is not None
 
 from ..models.project import Project
 from .token_stats import record_usage
 
 
+def _pooled_http_client():
+    """
+    Long-lived httpx client for LiteLLM's sync requests
+    
+    Connections are kept alive between calls, so repeated summary and
+    extraction calls skip the TCP/TLS handshake. Uses HTTP/2 when the
+    optional h2 package is installed.
+    """
+    import httpx
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
+
+
+@lru_cache(maxsize=1)
+def _completion():
+    """litellm.completion, importing litellm and installing the pooled client on first use"""
+    import litellm
+    if getattr(litellm, "client_session", None) is None:
+        litellm.client_session = _pooled_http_client()
+    return litellm.completion
+
+
 class LLMClient:
     """Unified LLM client"""
     
@@ -59,6 +89,7 @@ class LLMClient:
         messages: List[Dict],
         max_tokens: int = 1024,
         thinking: bool = False,
+        json_mode: bool = False,
     ) -> Tuple[str, Dict]:
         """
         Call LLM
@@ -69,6 +100,7 @@ class LLMClient:
             messages: Message list
             max_tokens: Maximum tokens
             thinking: Enable reasoning mode
+            json_mode: Ask the provider for a JSON object response
             
         Returns:
             (response_content, usage_info)
@@ -83,9 +115,11 @@ class LLMClient:
         kwargs = {}
         if "reasoner" in model or thinking:
             kwargs["thinking"] = {"type": "enabled"}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
         
         try:
-            resp = completion(
+            resp = _completion()(
                 model=model,
                 messages=messages,
                 max_tokens=max_tokens,
@@ -2,12 +2,16 @@
 Vector Database Infrastructure using FAISS
 """
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import json
 import numpy as np
 
 
+# Documents embedded per encode() call when indexing in bulk
+INDEX_BATCH_SIZE = 500
+
+
 class VectorDatabase:
     """Vector database for semantic search using FAISS"""
     
@@ -125,112 +129,167 @@ class VectorDatabase:
         embedding = self.embedding_model.encode(text, convert_to_numpy=True)
         return embedding
     
-    def index_character(self, project_id: str, char_id: str, char_data: Dict):
-        """Index a character for semantic search"""
-        if not self._available:
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for several texts in one batched model call"""
+        if not self._available or not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        return self.embedding_model.encode(texts, convert_to_numpy=True)
+    
+    @staticmethod
+    def _character_text(char_data: Dict) -> str:
+        """Searchable text for a character"""
+        text_parts = [
+            f"Name: {char_data['name']}",
+            f"Description: {char_data.get('description', '')}",
+        ]
+        
+        if char_data.get('alias'):
+            text_parts.append(f"Alias: {char_data['alias']}")
+        
+        if char_data.get('traits'):
+            text_parts.append(f"Traits: {', '.join(char_data['traits'])}")
+        
+        if char_data.get('goals'):
+            text_parts.append(f"Goals: {', '.join(char_data['goals'])}")
+            
+        if char_data.get('fears'):
+            text_parts.append(f"Fears: {', '.join(char_data['fears'])}")
+        
+        return "\n".join(text_parts)
+    
+    @staticmethod
+    def _scene_text(scene_data: Dict) -> str:
+        """Searchable text for a scene"""
+        text_parts = [
+            f"Title: {scene_data['title']}",
+        ]
+        
+        if scene_data.get('chapter'):
+            text_parts.append(f"Chapter: {scene_data['chapter']}")
+        
+        if scene_data.get('summary'):
+            text_parts.append(f"Summary: {scene_data['summary']}")
+        elif scene_data.get('body'):
+            # Use first 500 chars of body if no summary
+            preview = scene_data['body'][:500]
+            text_parts.append(f"Content: {preview}")
+        
+        if scene_data.get('tags'):
+            text_parts.append(f"Tags: {', '.join(scene_data['tags'])}")
+        
+        return "\n".join(text_parts)
+    
+    def _index_documents(self, project_id: str, collection_type: str, entries: List[Dict],
+                         batch_size: int = INDEX_BATCH_SIZE):
+        """
+        Embed and store documents in batches
+        
+        Args:
+            entries: Metadata dicts, each with at least "id" and "document"
+            batch_size: Documents per encode() call
+        
+        Each batch of up to batch_size documents is one encode() call
+        and one FAISS add. If a batch fails, its documents are retried one
+        by one, so a bad document only loses itself. The index is written
+        to disk once, after all batches.
+        
+        Documents are batched in order of length, so each batch pads to a
+        similar sequence length; metadata is keyed by the FAISS id each
+        document receives, so the order does not affect search results.
+        
+        Raises:
+            RuntimeError: If some documents could not be indexed
+        """
+        if not self._available or not entries:
             return
         
+        key = self._get_or_create_index(project_id, collection_type)
+        entries = sorted(entries, key=lambda entry: len(entry["document"]))
+        
+        failed = []
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            try:
+                self._add_documents(key, batch)
+            except Exception as e:
+                print(f"Warning: Batch of {len(batch)} {collection_type} failed ({e}), retrying one by one")
+                for entry in batch:
+                    try:
+                        self._add_documents(key, [entry])
+                    except Exception as item_error:
+                        print(f"  ✗ Warning: Failed to index {entry['id']}: {item_error}")
+                        failed.append(entry["id"])
+        
+        # Save to disk
+        self._save_index(key)
+        
+        if failed:
+            raise RuntimeError(f"Failed to index {len(failed)} of {len(entries)} {collection_type}: {failed}")
+    
+    def _add_documents(self, key: str, entries: List[Dict]):
+        """Embed entries in one encode() call and append them to index key"""
+        # Generate embeddings
+        embeddings = self.embed_texts([entry["document"] for entry in entries])
+        
+        # Add to FAISS index
+        first_id = self.indices[key].ntotal
+        self.indices[key].add(np.asarray(embeddings, dtype=np.float32))
+        
+        # Store metadata under the internal IDs just assigned
+        for offset, entry in enumerate(entries):
+            self.metadata[key][str(first_id + offset)] = entry
+    
+    def index_characters(self, project_id: str, characters: Dict[str, Dict],
+                         batch_size: int = INDEX_BATCH_SIZE):
+        """Index several characters ({char_id: char_data}) for semantic search"""
         try:
-            key = self._get_or_create_index(project_id, "characters")
-            
-            # Build searchable text from character data
-            text_parts = [
-                f"Name: {char_data['name']}",
-                f"Description: {char_data.get('description', '')}",
-            ]
-            
-            if char_data.get('alias'):
-                text_parts.append(f"Alias: {char_data['alias']}")
-            
-            if char_data.get('traits'):
-                text_parts.append(f"Traits: {', '.join(char_data['traits'])}")
-            
-            if char_data.get('goals'):
-                text_parts.append(f"Goals: {', '.join(char_data['goals'])}")
-                
-            if char_data.get('fears'):
-                text_parts.append(f"Fears: {', '.join(char_data['fears'])}")
-            
-            searchable_text = "\n".join(text_parts)
-            
-            # Generate embedding
-            embedding = self.embed_text(searchable_text)
-            
-            # Add to FAISS index
-            self.indices[key].add(np.array([embedding], dtype=np.float32))
-            
-            # Store metadata
-            internal_id = self.indices[key].ntotal - 1  # Last added vector
-            self.metadata[key][str(internal_id)] = {
-                "id": char_id,
-                "document": searchable_text,
-                "name": char_data['name'],
-                "type": "character"
-            }
-            
-            # Save to disk
-            self._save_index(key)
-            
+            self._index_documents(project_id, "characters", [
+                {
+                    "id": char_id,
+                    "document": self._character_text(char_data),
+                    "name": char_data['name'],
+                    "type": "character"
+                }
+                for char_id, char_data in characters.items()
+            ], batch_size)
         except Exception as e:
-            print(f"ERROR indexing character {char_id}: {type(e).__name__}: {e}")
+            print(f"ERROR indexing characters: {type(e).__name__}: {e}")
             import traceback
             traceback.print_exc()
             raise
     
-    def index_scene(self, project_id: str, scene_id: str, scene_data: Dict):
-        """Index a scene for semantic search"""
-        if not self._available:
-            return
-        
+    def index_scenes(self, project_id: str, scenes: Dict[str, Dict],
+                     batch_size: int = INDEX_BATCH_SIZE):
+        """Index several scenes ({scene_id: scene_data}) for semantic search"""
         try:
-            key = self._get_or_create_index(project_id, "scenes")
-            
-            # Build searchable text from scene data
-            text_parts = [
-                f"Title: {scene_data['title']}",
-            ]
-            
-            if scene_data.get('chapter'):
-                text_parts.append(f"Chapter: {scene_data['chapter']}")
-            
-            if scene_data.get('summary'):
-                text_parts.append(f"Summary: {scene_data['summary']}")
-            elif scene_data.get('body'):
-                # Use first 500 chars of body if no summary
-                preview = scene_data['body'][:500]
-                text_parts.append(f"Content: {preview}")
-            
-            if scene_data.get('tags'):
-                text_parts.append(f"Tags: {', '.join(scene_data['tags'])}")
-            
-            searchable_text = "\n".join(text_parts)
-            
-            # Generate embedding
-            embedding = self.embed_text(searchable_text)
-            
-            # Add to FAISS index
-            self.indices[key].add(np.array([embedding], dtype=np.float32))
-            
-            # Store metadata
-            internal_id = self.indices[key].ntotal - 1
-            self.metadata[key][str(internal_id)] = {
-                "id": scene_id,
-                "document": searchable_text,
-                "title": scene_data['title'],
-                "type": "scene"
-            }
-            
-            # Save to disk
-            self._save_index(key)
-            
+            self._index_documents(project_id, "scenes", [
+                {
+                    "id": scene_id,
+                    "document": self._scene_text(scene_data),
+                    "title": scene_data['title'],
+                    "type": "scene"
+                }
+                for scene_id, scene_data in scenes.items()
+            ], batch_size)
         except Exception as e:
-            print(f"ERROR indexing scene {scene_id}: {type(e).__name__}: {e}")
+            print(f"ERROR indexing scenes: {type(e).__name__}: {e}")
             import traceback
             traceback.print_exc()
             raise
     
-    def search_characters(self, project_id: str, query: str, top_k: int = 3) -> List[Dict]:
-        """Search for relevant characters using semantic similarity"""
+    def index_character(self, project_id: str, char_id: str, char_data: Dict):
+        """Index a character for semantic search"""
+        self.index_characters(project_id, {char_id: char_data})
+    
+    def index_scene(self, project_id: str, scene_id: str, scene_data: Dict):
+        """Index a scene for semantic search"""
+        self.index_scenes(project_id, {scene_id: scene_data})
+    
+    def search_characters(self, project_id: str, query: str, top_k: int = 3,
+                          query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Search for relevant characters using semantic similarity
+        
+        Pass query_embedding to reuse an embedding of query computed earlier."""
         if not self._available:
             return []
             
@@ -241,7 +300,8 @@ class VectorDatabase:
                 return []
             
             # Generate query embedding
-            query_embedding = self.embed_text(query)
+            if query_embedding is None:
+                query_embedding = self.embed_text(query)
             
             # Search in FAISS
             k = min(top_k, self.indices[key].ntotal)
@@ -266,8 +326,11 @@ class VectorDatabase:
             traceback.print_exc()
             return []
     
-    def search_scenes(self, project_id: str, query: str, top_k: int = 3) -> List[Dict]:
-        """Search for relevant scenes using semantic similarity"""
+    def search_scenes(self, project_id: str, query: str, top_k: int = 3,
+                      query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Search for relevant scenes using semantic similarity
+        
+        Pass query_embedding to reuse an embedding of query computed earlier."""
         if not self._available:
             return []
             
@@ -278,7 +341,8 @@ class VectorDatabase:
                 return []
             
             # Generate query embedding
-            query_embedding = self.embed_text(query)
+            if query_embedding is None:
+                query_embedding = self.embed_text(query)
             
             # Search in FAISS
             k = min(top_k, self.indices[key].ntotal)
@@ -303,6 +367,33 @@ class VectorDatabase:
             traceback.print_exc()
             return []
     
+    def search_all(self, project_id: str, query: str, char_top_k: int = 3,
+                   scene_top_k: int = 3,
+                   query_embedding: Optional[np.ndarray] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Search characters and scenes, embedding the query only once
+        
+        Pass query_embedding to reuse an embedding of query computed earlier.
+        
+        Returns:
+            (character results, scene results), as search_characters / search_scenes
+        """
+        if not self._available:
+            return [], []
+        
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_text(query)
+        except Exception as e:
+            print(f"Error embedding search query: {e}")
+            import traceback
+            traceback.print_exc()
+            return [], []
+        
+        return (
+            self.search_characters(project_id, query, char_top_k, query_embedding),
+            self.search_scenes(project_id, query, scene_top_k, query_embedding),
+        )
+    
     def delete_character(self, project_id: str, char_id: str):
         """Remove a character from the index
         Note: FAISS doesn't support direct deletion, would need to rebuild index"""
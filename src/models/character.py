@@ -42,6 +42,16 @@ class CharacterState(BaseModel):
     
     # Relationship states at this point
     relationships: Dict[str, Any] = {}  # {target_id: relationship_data}
+    
+    def fast_clone(self) -> "CharacterState":
+        """Copy for state replay: new lists and dicts, shared values"""
+        return self.model_copy(update={
+            "active_traits": list(self.active_traits),
+            "active_goals": list(self.active_goals),
+            "active_fears": list(self.active_fears),
+            "vars": dict(self.vars),
+            "relationships": dict(self.relationships),
+        })
 
 
 class Character(BaseModel):
@@ -2,9 +2,10 @@
 Project data model
 """
 from __future__ import annotations
-from typing import Dict, List, TYPE_CHECKING
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+from pydantic import BaseModel, Field, PrivateAttr
 from datetime import datetime
+import threading
 
 from .scene import Scene
 from .character import Character
@@ -16,6 +17,13 @@ if TYPE_CHECKING:
     from .storylet import Storylet, TickHistory
 
 
+# Guards touch() against derived() storing values; module-level so that
+# Project stays copyable. Held only for a dict update, never a factory call.
+_derived_lock = threading.Lock()
+
+_MISSING = object()
+
+
 class Project(BaseModel):
     """Project/Workspace model"""
     id: str
@@ -36,3 +44,109 @@ class Project(BaseModel):
     # World Director extensions
     storylets: Dict[str, 'Storylet'] = Field(default_factory=dict)
     tick_histories: Dict[str, 'TickHistory'] = Field(default_factory=dict)
+    
+    # Derived-data bookkeeping (runtime only, never serialized)
+    _revision: int = PrivateAttr(default=0)
+    _derived: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    
+    @property
+    def revision(self) -> int:
+        """Edit counter, bumped by services whenever project data changes"""
+        return self._revision
+    
+    def touch(self) -> None:
+        """Record a mutation and drop all cached derived data"""
+        with _derived_lock:
+            self._revision += 1
+            self._derived.clear()
+    
+    def derived(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Return a value computed from project data, cached until the next touch()
+        
+        Safe to call from several threads. A value whose factory overlapped a
+        touch() is returned but not cached; if two threads build the same key,
+        both get the value stored first.
+        """
+        value = self._derived.get(key, _MISSING)
+        if value is _MISSING:
+            revision = self._revision
+            value = factory()
+            with _derived_lock:
+                if self._revision == revision:
+                    value = self._derived.setdefault(key, value)
+        return value
+    
+    def get_ending_ids(self) -> List[str]:
+        """
+        IDs of ending scenes: marked isEnding, or no choice leads anywhere
+        
+        The isEnding flag set in the editor short-circuits the choice scan.
+        Cached per revision, so repeated lookups don't rescan every choice.
+        """
+        return self.derived("ending_ids", lambda: [
+            scene_id for scene_id, scene in self.scenes.items()
+            if scene.isEnding or not any(c.targetSceneId for c in scene.choices)
+        ])
+    
+    def get_scenes_by_character(self) -> Dict[str, List[str]]:
+        """
+        Character ID -> IDs of the scenes that list it as a participant
+        
+        Cached per revision; a scene appears once per character even if the
+        ID is repeated in its participants.
+        """
+        def build() -> Dict[str, List[str]]:
+            index: Dict[str, List[str]] = {}
+            for scene_id, scene in self.scenes.items():
+                for char_id in dict.fromkeys(scene.participants):
+                    index.setdefault(char_id, []).append(scene_id)
+            return index
+        return self.derived("scenes_by_character", build)
+    
+    def get_scenes_by_chapter(self) -> Dict[str, List[Scene]]:
+        """
+        Chapter heading -> scenes in that chapter, headings sorted by name
+        
+        Scenes without a chapter are listed under "No Chapter". Cached per
+        revision; scenes keep project order within each chapter.
+        """
+        def build() -> Dict[str, List[Scene]]:
+            index: Dict[str, List[Scene]] = {}
+            for scene in self.scenes.values():
+                index.setdefault(scene.chapter or "No Chapter", []).append(scene)
+            return dict(sorted(index.items()))
+        return self.derived("scenes_by_chapter", build)
+    
+    def get_incoming_scene_ids(self) -> Dict[str, List[str]]:
+        """
+        Scene ID -> IDs of the scenes with a choice leading to it
+        
+        Cached per revision; a source scene appears once per target even if
+        several of its choices lead there.
+        """
+        def build() -> Dict[str, List[str]]:
+            index: Dict[str, List[str]] = {}
+            for scene_id, scene in self.scenes.items():
+                for target_id in dict.fromkeys(c.targetSceneId for c in scene.choices):
+                    if target_id:
+                        index.setdefault(target_id, []).append(scene_id)
+            return index
+        return self.derived("incoming_scene_ids", build)
+    
+    def find_character(self, name: str) -> Optional[Character]:
+        """
+        Character whose name or alias equals name (case-insensitive)
+        
+        Uses a lowercased name/alias map cached per revision; when several
+        characters match, the first one in project order wins.
+        """
+        return self.derived("character_names", self._build_character_names).get(name.lower())
+    
+    def _build_character_names(self) -> Dict[str, Character]:
+        names: Dict[str, Character] = {}
+        for char in self.characters.values():
+            names.setdefault(char.name.lower(), char)
+            if char.alias:
+                names.setdefault(char.alias.lower(), char)
+        return names
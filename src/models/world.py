@@ -53,6 +53,19 @@ class WorldState(BaseModel):
     facts: Dict[str, WorldFact] = Field(default_factory=dict)  # {fact_id: WorldFact}
     vars: Dict[str, Any] = Field(default_factory=dict)  # Custom variables
     relations: Dict[str, Any] = Field(default_factory=dict)  # Relationship state (placeholder)
+    
+    def fast_clone(self) -> "WorldState":
+        """
+        Copy for state replay, much cheaper than deepcopy
+        
+        The facts, vars and relations dicts are copied; the values in them
+        are shared, since effects only ever replace entries.
+        """
+        return self.model_copy(update={
+            "facts": dict(self.facts),
+            "vars": dict(self.vars),
+            "relations": dict(self.relations),
+        })
 
 
 class ThreadStep(BaseModel):
@@ -3,6 +3,9 @@ AI Service - AI functionality service (MVP version)
 """
 from __future__ import annotations
 from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import uuid
 
 from ..models.project import Project
@@ -13,6 +16,13 @@ from ..infra.token_stats import check_token_limit
 from .search_service import SearchService
 
 
+# Async LLM calls share this pool, bounding concurrent requests per process
+MAX_CONCURRENT_LLM_CALLS = 8
+_llm_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_LLM_CALLS, thread_name_prefix="ai"
+)
+
+
 class AIService:
     """AI functionality service"""
     
@@ -58,6 +68,50 @@ class AIService:
         
         return summary
     
+    async def asummarize_scene(self, project: Project, scene: Scene) -> str:
+        """Async variant of summarize_scene (runs on the bounded LLM pool)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_llm_executor, self.summarize_scene, project, scene)
+    
+    def summarize_conversation(self, project: Project, history: List[Dict]) -> str:
+        """
+        Condense earlier chat turns into a short summary
+        
+        Args:
+            project: Project object
+            history: Chat turns [{"role": "user"|"assistant", "content": "..."}, ...]
+            
+        Returns:
+            Conversation summary text
+        """
+        can_proceed, message = check_token_limit(project, estimated_tokens=500)
+        if not can_proceed:
+            return f"Error: {message}"
+        
+        transcript = "\n".join(
+            f"{turn['role'].capitalize()}: {turn['content']}" for turn in history
+        )
+        
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant. Summarize the conversation between a writer and a story assistant, keeping names, decisions and open questions."
+            },
+            {
+                "role": "user",
+                "content": f"Conversation:\n{transcript}\n\nPlease summarize it concisely (under 150 words), in the same language as the conversation."
+            }
+        ]
+        
+        summary, _ = self.llm_client.call(
+            project=project,
+            task_type="summary",
+            messages=messages,
+            max_tokens=300,
+        )
+        
+        return summary
+    
     def extract_facts(self, project: Project, scene: Scene, save_to_project: bool = True) -> List[str]:
         """
         Extract worldview facts from scene and optionally save to project.worldState.facts
@@ -107,9 +161,13 @@ Example:
             max_tokens=500,
         )
         
+        return self._store_facts(project, scene, response.split('\n'), save_to_project)
+    
+    def _store_facts(self, project: Project, scene: Scene, lines: List[str], save_to_project: bool) -> List[str]:
+        """Parse "[Category] Content" lines into facts, optionally saving them to the project"""
         # Parse and structure the facts
         fact_contents = []
-        for line in response.split('\n'):
+        for line in lines:
             line = line.strip()
             if not line:
                 continue
@@ -136,8 +194,89 @@ Example:
                     )
                     project.worldState.facts[fact_id] = world_fact
         
+        if save_to_project and fact_contents:
+            project.touch()
+        
         return fact_contents
     
+    async def aextract_facts(self, project: Project, scene: Scene, save_to_project: bool = True) -> List[str]:
+        """Async variant of extract_facts (runs on the bounded LLM pool)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_llm_executor, self.extract_facts, project, scene, save_to_project)
+    
+    def analyze_scene_combined(self, project: Project, scene: Scene, save_to_project: bool = True) -> Dict:
+        """
+        Summarize a scene and extract its facts in a single LLM call
+        
+        The scene body is sent once and the model answers with a JSON object.
+        If the reply cannot be parsed, falls back to summarize_scene() and
+        extract_facts().
+        
+        Args:
+            project: Project object
+            scene: Scene object
+            save_to_project: Whether to persist extracted facts to project (default: True)
+            
+        Returns:
+            {"summary": str, "facts": List[str]}
+        """
+        can_proceed, message = check_token_limit(project, estimated_tokens=1000)
+        if not can_proceed:
+            return {"summary": f"Error: {message}", "facts": [f"Error: {message}"]}
+        
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a professional story analysis assistant. Summarize scenes and extract key worldview facts, character settings, and plot information. Reply with a JSON object only."
+            },
+            {
+                "role": "user",
+                "content": f"""Scene Title: {scene.title}
+
+Scene Content:
+{scene.body}
+
+Return a JSON object with two keys:
+- "summary": a concise summary of the scene (50-100 words)
+- "facts": a list of key facts, each a string in the format "[Category] Content", covering character traits and background, worldview settings, and important plot threads
+
+Example:
+{{"summary": "...", "facts": ["[Character] Alice is a skilled hacker", "[Setting] The city is under constant surveillance"]}}
+"""
+            }
+        ]
+        
+        response, _ = self.llm_client.call(
+            project=project,
+            task_type="extraction",
+            messages=messages,
+            max_tokens=700,
+            json_mode=True,
+        )
+        
+        try:
+            data = json.loads(response)
+            summary = data["summary"]
+            lines = data["facts"]
+            if not isinstance(summary, str) or not isinstance(lines, list):
+                raise ValueError("unexpected JSON shape")
+        except (ValueError, TypeError, KeyError):
+            # Not valid JSON (or an error message): use the two-call path
+            return {
+                "summary": self.summarize_scene(project, scene),
+                "facts": self.extract_facts(project, scene, save_to_project),
+            }
+        
+        facts = self._store_facts(project, scene, [str(line) for line in lines], save_to_project)
+        return {"summary": summary, "facts": facts}
+    
+    async def aanalyze_scene_combined(self, project: Project, scene: Scene, save_to_project: bool = True) -> Dict:
+        """Async variant of analyze_scene_combined (runs on the bounded LLM pool)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _llm_executor, self.analyze_scene_combined, project, scene, save_to_project
+        )
+    
     def check_ooc(
         self,
         project: Project,
@@ -25,6 +25,7 @@ class CharacterService:
             description=description,
         )
         project.characters[character.id] = character
+        project.touch()
         return character
     
     def get_character(self, project: Project, character_id: str) -> Optional[Character]:
@@ -46,12 +47,14 @@ class CharacterService:
             if hasattr(character, key):
                 setattr(character, key, value)
         
+        project.touch()
         return character
     
     def delete_character(self, project: Project, character_id: str) -> None:
         """Delete character"""
         if character_id in project.characters:
             del project.characters[character_id]
+            project.touch()
     
     def get_all_characters(self, project: Project) -> List[Character]:
         """Get all characters"""
@@ -71,4 +74,5 @@ class CharacterService:
         
         relationship = Relationship(targetId=target_id, summary=summary)
         character.relationships.append(relationship)
+        project.touch()
 
@@ -0,0 +1,109 @@
+"""
+Intent Classifier - local 'qa' / 'chat' classification over sentence embeddings
+
+Labeled example messages are embedded once with the vector database's
+multilingual model and averaged into one unit-length centroid per intent.
+A message is classified by cosine similarity to the two centroids, which
+takes one local embedding (a few milliseconds) instead of an LLM round trip.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from ..infra.vector_db import VectorDatabase
+
+
+# Labeled training messages per intent (mixed Chinese / English, like users)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "qa": [
+        "现在有几个角色？",
+        "陈墨是谁？",
+        "这个故事有几个结局？",
+        "分析一下Scene 5",
+        "帝国和教会的关系",
+        "林雪薇在第三章做了什么",
+        "哪些场景发生在警察局",
+        "主角和反派之间是什么关系",
+        "第二个结局是怎么触发的",
+        "世界观里有哪些设定",
+        "How many characters are in the story?",
+        "Who is the detective?",
+        "Which scenes take place at night?",
+        "What happened in the previous scene?",
+        "List all the endings",
+        "What is the relationship between Chen Mo and Lin Xuewei?",
+    ],
+    "chat": [
+        "我觉得这个角色设定怎么样？",
+        "有什么建议吗？",
+        "怎么改进这段剧情？",
+        "你好",
+        "帮我想想接下来的剧情",
+        "这个结局会不会太突兀了",
+        "我想让反派更有魅力一些",
+        "给我一些灵感吧",
+        "谢谢你的帮助",
+        "Hello!",
+        "What do you think of my protagonist?",
+        "Can you suggest a better twist?",
+        "Let's brainstorm a new subplot",
+        "I'm not sure the pacing works",
+        "How can I make the dialogue more natural?",
+        "Thanks, that helps a lot",
+    ],
+}
+
+# Scale applied to the cosine-similarity margin before the logistic;
+# a margin of 0.05 maps to ~73% confidence
+MARGIN_SCALE = 20.0
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class IntentClassifier:
+    """Nearest-centroid classifier for 'qa' / 'chat' intent"""
+
+    def __init__(self, embed: Callable[[str], np.ndarray],
+                 examples: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            embed: Text -> embedding vector function
+            examples: Labeled messages per intent (defaults to INTENT_EXAMPLES)
+        """
+        self.embed = embed
+        examples = examples or INTENT_EXAMPLES
+        self.labels = list(examples)
+        self.centroids = np.stack([
+            _unit(np.mean([_unit(np.asarray(embed(text), dtype=np.float32)) for text in texts], axis=0))
+            for texts in examples.values()
+        ])
+
+    def predict(self, message: str) -> Tuple[str, float]:
+        """
+        Classify message
+
+        Returns:
+            (intent, confidence) where confidence is in [0.5, 1.0]
+        """
+        scores = self.centroids @ _unit(np.asarray(self.embed(message), dtype=np.float32))
+        best, second = np.argsort(scores)[::-1][:2]
+        margin = float(scores[best] - scores[second])
+        return self.labels[best], 1.0 / (1.0 + math.exp(-MARGIN_SCALE * margin))
+
+
+@lru_cache(maxsize=4)
+def get_intent_classifier(vector_db: Optional[VectorDatabase]) -> Optional[IntentClassifier]:
+    """
+    Classifier over vector_db's embedding model, built once per database
+
+    Returns None when no embedding model is available.
+    """
+    if vector_db is None or not vector_db.is_available():
+        return None
+    return IntentClassifier(vector_db.embed_text)
@@ -9,20 +9,492 @@ Enhanced with:
 - Dynamic state tools: get_character_state, get_relationship, explain_state_change
 - Token usage tracking via callback handler
 """
-from typing import Literal, Optional
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from typing import Callable, Literal, Optional
 from typing_extensions import TypedDict
+import asyncio
+import hashlib
+import inspect
+import json
+import re
+import string
+import time
+import uuid
 from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, ToolMessage, RemoveMessage
 from langchain_litellm import ChatLiteLLM
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_core.callbacks import BaseCallbackHandler
 
 from ..models.project import Project
 from .search_service import SearchService
 from .ai_service import AIService
 from .state_service import StateService
+from .scene_index import get_scene_index
+from .intent_classifier import get_intent_classifier
 from ..infra.token_stats import record_usage
+from ..infra.async_utils import run_sync
+
+
+# Final answer used when every tool call in a round failed
+TOOL_ERROR_REPLY = "抱歉，查询故事数据时出错了，请稍后重试或换个问法。 / Sorry, I ran into an error while looking up the story data. Please try again or rephrase your question."
+
+# Name tag for the SystemMessage carrying the rolling history summary
+_SUMMARY_MESSAGE_NAME = "conversation_summary"
+
+# explain_state_change report; sections are pre-rendered Markdown
+_STATE_DIFF_TEMPLATE = string.Template(
+    "**Changes from Step $from_step → $to_step** in Thread '$thread_id'\n\n"
+    "$target_section$relationship_section"
+)
+
+# Preview lengths: tool results in chat steps, descriptions in listings
+_TOOL_RESULT_PREVIEW_CHARS = 500
+_LISTING_PREVIEW_CHARS = 100
+
+# Names / IDs listed in "not found" tool replies
+_ERROR_SAMPLE_SIZE = 10
+
+# Local classifier predictions below this confidence go to the LLM classifier
+_LOCAL_INTENT_MIN_CONFIDENCE = 0.6
+
+# Graph nodes whose LLM tokens achat_stream forwards to the caller
+_STREAMED_NODES = frozenset({"qa_agent", "chat_agent"})
+
+
+# Keyword markers for intent classification. A message matching exactly one
+# of these is classified without the classifier LLM; messages matching both
+# or neither still go to the LLM.
+_QA_INTENT_RE = re.compile(
+    r"分析|有几个|有多少|多少个|是谁|列出|哪些|哪个|哪一|什么时候|在哪|结局|统计"
+    r"|\b(?:who|what|which|where|when)\s+(?:is|are|was|were|does|did)\b"
+    r"|\bhow\s+many\b|\blist\b|\bcount\b|\bfind\b|\bsearch\b|\banaly[sz]e\b"
+    r"|\bscene\s*\d+",
+    re.IGNORECASE,
+)
+_CHAT_INTENT_RE = re.compile(
+    r"你好|您好|谢谢|建议|觉得|想法|怎么改|如何改|改进|头脑风暴|灵感|帮我想"
+    r"|\b(?:hi|hello|hey|thanks|thank\s+you)\b|\bbrainstorm|\bsuggest|\bideas?\b"
+    r"|\bimprove\b|\bwhat\s+do\s+you\s+think\b|\bfeedback\b",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=256)
+def _rule_intent(message: str) -> Optional[str]:
+    """'qa' or 'chat' when keyword rules decide the intent, None if ambiguous"""
+    is_qa = _QA_INTENT_RE.search(message) is not None
+    is_chat = _CHAT_INTENT_RE.search(message) is not None
+    if is_qa != is_chat:
+        return "qa" if is_qa else "chat"
+    if not is_qa and len(message) <= 2:
+        # "ok", "嗯", "好" ... acknowledgements, not questions
+        return "chat"
+    return None
+
+
+def _query_pattern(*forms: str) -> "re.Pattern":
+    """Case-insensitive pattern matching any of forms plus trailing punctuation"""
+    return re.compile(
+        "(?:" + "|".join(forms) + r")\s*[?？。.!！]*", re.I
+    )
+
+
+def _scene_args(match, project: Project) -> Optional[dict]:
+    """analyze_scene args for a captured scene ID that exists in the project"""
+    scene_id = next(group for group in match.groups() if group)
+    return {"scene_id": scene_id} if scene_id in project.scenes else None
+
+
+# Canonical queries answered by a single known tool call. Each entry is
+# (pattern, tool name, args builder); the builder gets the match and the
+# project and may return None to decline (e.g. unknown scene ID), in which
+# case the query goes to the LLM as usual. Patterns must match the whole
+# message, so anything more specific than these forms still reaches the LLM.
+_TOOL_PATTERNS = [
+    (_query_pattern(r"(?:please\s+)?analy[sz]e\s+scene\s+(\S+?)",
+                    r"scene\s+(\S+?)\s+analy[sz]e",
+                    r"分析(?:一下)?\s*(?:场景|scene)\s*(\S+?)"),
+     "analyze_scene", _scene_args),
+    (_query_pattern(r"(?:list|show)(?:\s+me)?\s+all(?:\s+the)?\s+characters",
+                    r"(?:给我)?(?:列出)?所有(?:的)?角色"),
+     "get_all_characters", lambda m, project: {}),
+    (_query_pattern(r"(?:list|show)(?:\s+me)?\s+all(?:\s+the)?\s+scenes",
+                    r"(?:给我)?(?:列出)?所有(?:的)?场景"),
+     "get_all_scenes", lambda m, project: {}),
+    (_query_pattern(r"how\s+many\s+endings(?:\s+(?:are\s+there|does\s+the\s+story\s+have))?",
+                    r"(?:这个)?故事有几个结局"),
+     "count_endings", lambda m, project: {}),
+    (_query_pattern(r"(?:list|show)(?:\s+me)?\s+(?:all\s+)?(?:the\s+)?world\s+facts",
+                    r"(?:列出)?所有(?:的)?世界观设定"),
+     "get_world_facts", lambda m, project: {}),
+]
+
+
+def _dispatch_tool_call(text: str, project: Project) -> Optional[dict]:
+    """Tool call for a canonical query, or None if the LLM should decide"""
+    text = text.strip()
+    for pattern, tool_name, build_args in _TOOL_PATTERNS:
+        match = pattern.fullmatch(text)
+        if match:
+            args = build_args(match, project)
+            if args is not None:
+                return {
+                    "name": tool_name,
+                    "args": args,
+                    "id": f"dispatch_{uuid.uuid4().hex[:12]}",
+                    "type": "tool_call",
+                }
+    return None
+
+
+_MESSAGE_TYPES = {"user": HumanMessage, "assistant": AIMessage}
+
+
+def _history_message(msg) -> Optional[BaseMessage]:
+    """LangChain message for one history entry, reusing prior conversions
+    
+    BaseMessage entries pass through unchanged. For dict entries the converted
+    message is kept under ``msg["_lc"]`` and reused while role and content are
+    unchanged, so a long chat history isn't re-validated on every turn.
+    Returns None for roles the agent doesn't replay.
+    """
+    if isinstance(msg, BaseMessage):
+        return msg
+    
+    message_cls = _MESSAGE_TYPES.get(msg["role"])
+    if message_cls is None:
+        return None
+    
+    cached = msg.get("_lc")
+    if isinstance(cached, message_cls) and cached.content == msg["content"]:
+        return cached
+    
+    message = message_cls(content=msg["content"])
+    msg["_lc"] = message
+    return message
+
+
+def _history_turn(msg) -> Optional[dict]:
+    """Plain {role, content} view of a history entry (dict or BaseMessage)"""
+    if isinstance(msg, BaseMessage):
+        for role, message_cls in _MESSAGE_TYPES.items():
+            if isinstance(msg, message_cls):
+                return {"role": role, "content": msg.content}
+        return None
+    if msg["role"] in _MESSAGE_TYPES:
+        return {"role": msg["role"], "content": msg["content"]}
+    return None
+
+
+def _participant_names(project: Project, scene) -> list:
+    """Names of the scene's participants, memoized on the scene
+    
+    Stored as ``scene._participant_names_cache`` and recomputed when the
+    participant list or any character (project revision) changes.
+    """
+    key = (tuple(scene.participants), project.revision)
+    cached = getattr(scene, "_participant_names_cache", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    
+    characters = project.characters
+    names = [characters[char_id].name for char_id in scene.participants if char_id in characters]
+    scene._participant_names_cache = (key, names)
+    return names
+
+
+def _message_steps(msg, round_count: int) -> list:
+    """
+    UI steps for one graph message
+    
+    A tool-calling AIMessage opens round round_count (a "thinking" step plus
+    one "tool_call" per call); a ToolMessage gives a "tool_result".
+    """
+    if isinstance(msg, AIMessage) and msg.tool_calls:
+        steps = [{
+            "type": "thinking",
+            "content": f"🤔 Thinking... (Round {round_count})"
+        }]
+        for tc in msg.tool_calls:
+            steps.append({
+                "type": "tool_call",
+                "tool": tc["name"],
+                "args": tc.get("args", {})
+            })
+        return steps
+    if isinstance(msg, ToolMessage):
+        return [{
+            "type": "tool_result",
+            "tool": msg.name,
+            "content": _truncate(msg.content, _TOOL_RESULT_PREVIEW_CHARS)
+        }]
+    return []
+
+
+def _truncate(text: str, limit: int) -> str:
+    """text cut to limit characters plus "...", or text itself if it fits"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+def _bounded_csv(items, limit: int) -> str:
+    """First limit items joined by ', ', noting how many were left out"""
+    items = list(items)
+    text = ', '.join(items[:limit])
+    if len(items) > limit:
+        text += f" (+{len(items) - limit} more)"
+    return text
+
+
+def _change_lines(changes: dict) -> str:
+    """Markdown bullet per changed key of a diff_states() section"""
+    return "".join(
+        f"- {key}: {change[0]} → {change[1]}\n" if isinstance(change, tuple) else f"- {key}: {change}\n"
+        for key, change in changes.items()
+    )
+
+
+def _tool_error(code: str, msg: str) -> str:
+    """Machine-readable tool failure payload, recognized by _is_tool_error()"""
+    return json.dumps({"ok": False, "code": code, "msg": msg}, ensure_ascii=False)
+
+
+def _is_tool_error(message) -> bool:
+    """True if a ToolMessage reports a failure (structured payload or error status)"""
+    if getattr(message, "status", None) == "error":
+        return True
+    return _is_error_payload(message.content)
+
+
+def _is_error_payload(content) -> bool:
+    """True if a tool result is a _tool_error payload"""
+    if not isinstance(content, str) or not content.startswith('{"ok": false'):
+        return False
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and payload.get("ok") is False
+
+
+# Seconds a cached tool result stays valid for tools that also depend on data
+# outside the project (the vector index is maintained separately); all other
+# tool results live until the next project edit
+_TOOL_CACHE_TTL = {"search_story_context": 300.0}
+
+# Cosine similarity above which two context queries share a cached result
+_SEMANTIC_CACHE_THRESHOLD = 0.95
+# Embedded queries kept per tool for semantic lookups
+_SEMANTIC_CACHE_SIZE = 32
+
+# Embedding of the argument of the _cached_tool call in progress, so the
+# tool can search with it instead of embedding its query again
+_tool_call_embedding: ContextVar = ContextVar("tool_call_embedding", default=None)
+
+
+def _unit(vector):
+    """vector scaled to unit length, or None for a zero vector"""
+    norm = float((vector @ vector) ** 0.5)
+    return vector / norm if norm else None
+
+
+def _cached_tool(project: Project, name: Optional[str] = None,
+                 embed: Optional[Callable] = None):
+    """
+    Decorator memoizing a tool function per (name, arguments)
+    
+    Results are stored in ``project.derived("tool_results")``, so any project
+    edit (touch) drops them; tools listed in _TOOL_CACHE_TTL also expire by
+    age. With ``embed`` (argument -> embedding or None), a call whose
+    embedding is within _SEMANTIC_CACHE_THRESHOLD cosine similarity of an
+    earlier call reuses that result; on a miss the embedding is available to
+    the tool as ``_tool_call_embedding.get()``. Error payloads are never cached. Works on sync and async
+    functions; pass ``name`` so a sync tool and its coroutine share entries.
+    """
+    def decorator(fn):
+        tool_name = name or fn.__name__
+        ttl = _TOOL_CACHE_TTL.get(tool_name)
+        signature = inspect.signature(fn)
+        
+        def fresh(stamp: float) -> bool:
+            return ttl is None or time.monotonic() - stamp < ttl
+        
+        def lookup(args: tuple):
+            """(cached result or None, embedding of args or None)"""
+            entry = project.derived("tool_results", dict).get((tool_name, args))
+            if entry is not None and fresh(entry[1]):
+                return entry[0], None
+            
+            embedding = embed(*args) if embed is not None else None
+            vector = _unit(embedding) if embedding is not None else None
+            if vector is not None:
+                similar = project.derived("tool_result_vectors", dict).get(tool_name, [])
+                for other, result, stamp in similar:
+                    if fresh(stamp) and float(other @ vector) >= _SEMANTIC_CACHE_THRESHOLD:
+                        return result, embedding
+            return None, embedding
+        
+        def store(args: tuple, embedding, result: str):
+            if _is_error_payload(result):
+                return
+            # Fetched after the call: a tool that edits the project (e.g.
+            # analyze_scene saving facts) stores into the new revision
+            stamp = time.monotonic()
+            project.derived("tool_results", dict)[(tool_name, args)] = (result, stamp)
+            vector = _unit(embedding) if embedding is not None else None
+            if vector is not None:
+                similar = project.derived("tool_result_vectors", dict).setdefault(tool_name, [])
+                similar.append((vector, result, stamp))
+                del similar[:-_SEMANTIC_CACHE_SIZE]
+        
+        def key(*args, **kwargs) -> tuple:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.values())
+        
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                call_args = key(*args, **kwargs)
+                # Embedding the query is CPU-bound; keep it off the event loop
+                if embed is not None:
+                    cached, embedding = await asyncio.to_thread(lookup, call_args)
+                else:
+                    cached, embedding = lookup(call_args)
+                if cached is not None:
+                    return cached
+                token = _tool_call_embedding.set(embedding)
+                try:
+                    result = await fn(*args, **kwargs)
+                finally:
+                    _tool_call_embedding.reset(token)
+                store(call_args, embedding, result)
+                return result
+            return async_wrapper
+        
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_args = key(*args, **kwargs)
+            cached, embedding = lookup(call_args)
+            if cached is not None:
+                return cached
+            token = _tool_call_embedding.set(embedding)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _tool_call_embedding.reset(token)
+            store(call_args, embedding, result)
+            return result
+        return wrapper
+    
+    return decorator
+
+
+def _supports_prompt_caching(model: str) -> bool:
+    """Whether the provider needs explicit cache_control markers for prefix caching
+    
+    Anthropic models only reuse a cached prompt prefix when it is flagged;
+    DeepSeek/OpenAI cache repeated prefixes automatically.
+    """
+    model = model.lower()
+    return model.startswith("anthropic/") or "claude" in model
+
+
+@lru_cache(maxsize=64)
+def _qa_system_prompt(project_name: str, n_characters: int, n_scenes: int) -> str:
+    """QA agent prompt; memoized so identical project shapes reuse one string"""
+    return f"""You are a professional story database assistant for the interactive fiction project "{project_name}".
+
+Your role is to provide ACCURATE, FACTUAL answers about this story by using the available tools.
+
+IMPORTANT RULES:
+1. When user asks factual questions, ALWAYS use tools to get accurate information
+2. Do NOT make up or hallucinate information
+3. If you can't find information with tools, say so clearly
+4. Prioritize using 'search_story_context' for general queries about worldview, lore, or background
+5. Use 'analyze_scene' when user asks to analyze or review a specific scene
+6. Use specific query tools (get_character_by_name, search_scenes, etc.) for targeted lookups
+
+Available tools:
+- search_story_context(query) - **Use this FIRST for most questions** - Semantic search across all story content
+- analyze_scene(scene_id) - Comprehensive scene analysis with AI-generated summary and fact extraction
+- get_all_characters() - List all characters
+- get_character_by_name(name) - Get character details
+- get_all_scenes() - List all scenes
+- search_scenes(keyword) - Find scenes by keyword
+- count_endings() - Count story endings
+- get_world_facts() - Get extracted world lore
+
+Current project: {project_name}
+Total characters: {n_characters}
+Total scenes: {n_scenes}
+
+Respond in the same language as the user's question (Chinese or English)."""
+
+
+@lru_cache(maxsize=64)
+def _chat_system_prompt(project_name: str, locale: str) -> str:
+    """Chat agent prompt; memoized per (project name, locale)"""
+    return f"""You are a creative writing consultant for the interactive fiction project "{project_name}".
+
+Your role is to DISCUSS, BRAINSTORM, and provide SUGGESTIONS about story development.
+
+IMPORTANT RULES:
+1. You can ask clarifying questions
+2. Provide constructive feedback and creative suggestions
+3. You MAY use tools if you need to check facts, but prioritize conversation
+4. Be encouraging and supportive of the writer's creative process
+5. Help identify potential plot holes or character inconsistencies
+
+When discussing:
+- Story structure and pacing
+- Character development arcs
+- Narrative themes and motifs
+- Player choices and branching logic
+- Emotional impact and player engagement
+
+Current project: {project_name}
+Locale: {locale}
+
+Respond in the same language as the user's question (Chinese or English)."""
+
+
+@lru_cache(maxsize=16)
+def _cached_system_message(prompt: str, cache_control: bool) -> SystemMessage:
+    """
+    SystemMessage for prompt, built once per prompt
+    
+    The message gets a fixed ID derived from the prompt up front: the graph's
+    message reducer assigns IDs to ID-less messages in place, which must not
+    happen to an object shared between runs.
+    """
+    message_id = "system-" + hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+    if cache_control:
+        return SystemMessage(id=message_id, content=[{
+            "type": "text",
+            "text": prompt,
+            "cache_control": {"type": "ephemeral"},
+        }])
+    return SystemMessage(id=message_id, content=prompt)
+
+
+def _agent_service(config: RunnableConfig) -> "LangGraphAgentService":
+    """The service instance a shared graph run belongs to"""
+    return config["configurable"]["agent_service"]
+
+
+class AgentState(MessagesState):
+    """Graph state: the message list plus routing data shared by the nodes"""
+    intent: str
+    # QA agent reply prefetched while the intent classifier was running
+    speculative: Optional[AIMessage]
+    # Whether the agent system prompt has been written into messages
+    system_injected: bool
 
 
 class TokenTrackingCallback(BaseCallbackHandler):
@@ -31,19 +503,48 @@ class TokenTrackingCallback(BaseCallbackHandler):
     def __init__(self, project: Project, feature: str = "agent_chat"):
         self.project = project
         self.feature = feature
+        # Prompt tokens served from the provider's prefix cache
+        self.cache_read_tokens = 0
     
     def on_llm_end(self, response, **kwargs):
         """Called when LLM finishes"""
         try:
             # Extract token usage from response
+            usage = None
             if hasattr(response, 'llm_output') and response.llm_output:
                 usage = response.llm_output.get('token_usage', {})
-                if usage:
-                    # Record usage
-                    record_usage(self.project, self.feature, usage)
+            if not usage:
+                # Streamed generations carry usage on the aggregated message
+                usage = self._streamed_usage(response)
+            if usage:
+                # Record usage
+                record_usage(self.project, self.feature, usage)
+                self.cache_read_tokens += self._cached_prompt_tokens(usage)
         except Exception as e:
             # Silently fail - don't break agent execution
             pass
+    
+    @staticmethod
+    def _streamed_usage(response) -> Optional[dict]:
+        """usage_metadata of the first generation's message, if any"""
+        try:
+            message = response.generations[0][0].message
+        except (AttributeError, IndexError):
+            return None
+        return dict(getattr(message, "usage_metadata", None) or {}) or None
+    
+    @staticmethod
+    def _cached_prompt_tokens(usage) -> int:
+        """Read cache-hit prompt tokens from Anthropic/DeepSeek/OpenAI style usage"""
+        if not isinstance(usage, dict):
+            usage = getattr(usage, "model_dump", lambda: {})()
+        cached = usage.get("cache_read_input_tokens") or usage.get("prompt_cache_hit_tokens")
+        if not cached:
+            details = usage.get("prompt_tokens_details") or {}
+            if not isinstance(details, dict):
+                details = getattr(details, "model_dump", lambda: {})()
+            cached = details.get("cached_tokens")
+        return cached or 0
 
 
 class LangGraphAgentService:
@@ -56,6 +557,24 @@ class LangGraphAgentService:
     - Tools: Story query functions decorated with @tool
     """
     
+    # Most recent history turns (user + assistant pairs) sent verbatim;
+    # anything older is folded into a single summary message
+    HISTORY_WINDOW_TURNS = 8
+    
+    # Summaries of trimmed history, keyed by a hash of the trimmed turns.
+    # Class-level because the UI builds a new service for every message.
+    _SUMMARY_CACHE_SIZE = 64
+    _summary_cache: "OrderedDict[str, str]" = OrderedDict()
+    
+    # Compiled graphs per class, and (llm, classifier_llm, llm_with_tools)
+    # per (model, tool names). Neither depends on the project, so services
+    # built per message skip graph compilation and tool schema generation.
+    _GRAPH_CACHE: dict = {}
+    _LLM_CACHE: dict = {}
+    
+    # OpenAI-format tool schemas per tuple of tool names
+    _TOOL_SCHEMA_CACHE: dict = {}
+    
     def __init__(self, project: Project, model: str = "deepseek/deepseek-chat", 
                  search_service: Optional[SearchService] = None,
                  ai_service: Optional[AIService] = None,
@@ -66,31 +585,76 @@ class LangGraphAgentService:
         self.ai_service = ai_service or AIService()
         self.state_service = state_service or StateService()
         
-        # Token tracking callback
+        # Token tracking callback, attached to each run's config since the
+        # LLMs are shared across projects
         self.token_callback = TokenTrackingCallback(project, feature="agent_chat")
         
-        # Initialize ChatLiteLLM with callback
-        self.llm = ChatLiteLLM(
-            model=model,
-            temperature=0.2,
-            callbacks=[self.token_callback]
-        )
-        
-        # Initialize classifier LLM with callback
-        self.classifier_llm = ChatLiteLLM(
-            model=model,
-            temperature=0.0,
-            callbacks=[self.token_callback]
-        )
-        
         # Create tools
         self.tools = self._create_tools()
+        self._tools_by_name = {t.name: t for t in self.tools}
+        
+        self.llm, self.classifier_llm, self.llm_with_tools = self._shared_llms(model, self.tools)
         
-        # Bind tools to LLM
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        # Agent graph (shared by all instances)
+        self.agent = self._compiled_graph()
+    
+    @classmethod
+    def warm_up(cls, model: str = "deepseek/deepseek-chat",
+                search_service: Optional[SearchService] = None) -> None:
+        """
+        Build the shared graph, tool-bound LLM and intent classifier ahead of time
         
-        # Build agent graph
-        self.agent = self._build_graph()
+        Call once at startup (e.g. from a background thread) so the first
+        chat message skips tool schema generation, graph compilation and
+        embedding the classifier examples.
+        """
+        search_service = search_service or SearchService()
+        cls(Project(id="warm-up", name="warm-up"), model=model, search_service=search_service)
+        get_intent_classifier(search_service.vector_db)
+    
+    @classmethod
+    def _shared_llms(cls, model: str, tools: list) -> tuple:
+        """(llm, classifier_llm, llm_with_tools) for model, built once per tool set"""
+        key = (model, tuple(t.name for t in tools))
+        llms = cls._LLM_CACHE.get(key)
+        if llms is None:
+            # streaming lets achat_stream forward tokens as the provider
+            # produces them
+            llm = ChatLiteLLM(model=model, temperature=0.2, streaming=True)
+            # The classifier reuses the same client with per-call overrides
+            # instead of a second ChatLiteLLM instance
+            classifier_llm = llm.bind(temperature=0.0, stream=False)
+            llms = cls._LLM_CACHE[key] = (llm, classifier_llm, llm.bind_tools(cls._tool_schemas(tools)))
+        return llms
+    
+    @classmethod
+    def _tool_schemas(cls, tools: list) -> list:
+        """
+        OpenAI tool schemas for tools, converted once per tool set
+        
+        Schemas only depend on the tool signatures, not the project, and
+        bind_tools passes already-converted dicts through unchanged.
+        """
+        key = tuple(t.name for t in tools)
+        schemas = cls._TOOL_SCHEMA_CACHE.get(key)
+        if schemas is None:
+            schemas = cls._TOOL_SCHEMA_CACHE[key] = [convert_to_openai_tool(t) for t in tools]
+        return schemas
+    
+    @classmethod
+    def _compiled_graph(cls):
+        """The agent graph for this class, compiled on first use"""
+        graph = cls._GRAPH_CACHE.get(cls)
+        if graph is None:
+            graph = cls._GRAPH_CACHE[cls] = cls._build_graph()
+        return graph
+    
+    def _run_config(self) -> RunnableConfig:
+        """Per-run config: this service for the shared graph, plus token tracking"""
+        return {
+            "callbacks": [self.token_callback],
+            "configurable": {"agent_service": self},
+        }
     
     def _create_tools(self):
         """Create LangChain tools for story queries"""
@@ -101,6 +665,15 @@ class LangGraphAgentService:
         
         # ===== NEW: Dynamic State Query Tools =====
         
+        def thread_state(thread_id: str, step_index: int):
+            """
+            state_service.compute_state, shared by the three state tools
+            
+            The tools only read the result, so it is taken straight from
+            StateService's per-revision cache without a copy.
+            """
+            return state_service.compute_state(project, thread_id, step_index, copy=False)
+        
         @tool
         def get_character_state(character_id: str, thread_id: str, step_index: int) -> str:
             """Get a character's dynamic state at a specific point in a story thread.
@@ -119,9 +692,8 @@ class LangGraphAgentService:
                 Formatted character state at that point
             """
             try:
-                char_state = state_service.get_character_state_at_step(
-                    project, thread_id, step_index, character_id
-                )
+                _, char_states, _ = thread_state(thread_id, step_index)
+                char_state = char_states.get(character_id)
                 
                 if not char_state:
                     return f"Character '{character_id}' not found or no state available."
@@ -130,31 +702,31 @@ class LangGraphAgentService:
                 char = project.characters.get(character_id)
                 char_name = char.name if char else character_id
                 
-                result = f"**{char_name}** at Thread '{thread_id}', Step {step_index}\n\n"
+                parts = [f"**{char_name}** at Thread '{thread_id}', Step {step_index}\n\n"]
                 
                 if char_state.mood:
-                    result += f"- **Mood:** {char_state.mood}\n"
+                    parts.append(f"- **Mood:** {char_state.mood}\n")
                 if char_state.status:
-                    result += f"- **Status:** {char_state.status}\n"
+                    parts.append(f"- **Status:** {char_state.status}\n")
                 if char_state.location:
-                    result += f"- **Location:** {char_state.location}\n"
+                    parts.append(f"- **Location:** {char_state.location}\n")
                 
                 if char_state.active_traits:
-                    result += f"- **Active Traits:** {', '.join(char_state.active_traits)}\n"
+                    parts.append(f"- **Active Traits:** {', '.join(char_state.active_traits)}\n")
                 if char_state.active_goals:
-                    result += f"- **Current Goals:** {', '.join(char_state.active_goals)}\n"
+                    parts.append(f"- **Current Goals:** {', '.join(char_state.active_goals)}\n")
                 if char_state.active_fears:
-                    result += f"- **Active Fears:** {', '.join(char_state.active_fears)}\n"
+                    parts.append(f"- **Active Fears:** {', '.join(char_state.active_fears)}\n")
                 
                 if char_state.vars:
-                    result += f"\n**Custom State Variables:**\n"
+                    parts.append(f"\n**Custom State Variables:**\n")
                     for key, val in char_state.vars.items():
-                        result += f"  - {key}: {val}\n"
+                        parts.append(f"  - {key}: {val}\n")
                 
-                return result
+                return "".join(parts)
                 
             except Exception as e:
-                return f"Error getting character state: {str(e)}"
+                return _tool_error("character_state_failed", str(e))
         
         @tool
         def get_relationship(char_a_id: str, char_b_id: str, thread_id: str, step_index: int) -> str:
@@ -174,7 +746,7 @@ class LangGraphAgentService:
                 Relationship state information
             """
             try:
-                _, _, rel_states = state_service.compute_state(project, thread_id, step_index)
+                _, _, rel_states = thread_state(thread_id, step_index)
                 
                 # Try both orderings
                 rel_key = f"{char_a_id}|{char_b_id}"
@@ -190,15 +762,15 @@ class LangGraphAgentService:
                 name_a = char_a.name if char_a else char_a_id
                 name_b = char_b.name if char_b else char_b_id
                 
-                result = f"**{name_a} ↔ {name_b}** at Thread '{thread_id}', Step {step_index}\n\n"
+                parts = [f"**{name_a} ↔ {name_b}** at Thread '{thread_id}', Step {step_index}\n\n"]
                 
                 for key, val in rel_data.items():
-                    result += f"- {key}: {val}\n"
+                    parts.append(f"- {key}: {val}\n")
                 
-                return result
+                return "".join(parts)
                 
             except Exception as e:
-                return f"Error getting relationship: {str(e)}"
+                return _tool_error("relationship_failed", str(e))
         
         @tool
         def explain_state_change(target: str, thread_id: str, from_step: int, to_step: int) -> str:
@@ -218,46 +790,50 @@ class LangGraphAgentService:
                 Description of changes
             """
             try:
-                diff = state_service.diff_state(project, thread_id, from_step, to_step)
-                
-                result = f"**Changes from Step {from_step} → {to_step}** in Thread '{thread_id}'\n\n"
+                diff = state_service.diff_states(
+                    thread_state(thread_id, from_step), thread_state(thread_id, to_step)
+                )
                 
                 if target == "world":
                     if diff["world"]:
-                        result += "## World Changes:\n"
-                        for var_name, (old_val, new_val) in diff["world"].items():
-                            result += f"- {var_name}: {old_val} → {new_val}\n"
+                        section = "## World Changes:\n" + _change_lines(diff["world"])
                     else:
-                        result += "No world state changes.\n"
+                        section = "No world state changes.\n"
                 
                 elif target in project.characters:
                     if target in diff["characters"]:
                         char = project.characters[target]
-                        result += f"## {char.name} Changes:\n"
-                        for field, change in diff["characters"][target].items():
-                            if isinstance(change, tuple):
-                                old_val, new_val = change
-                                result += f"- {field}: {old_val} → {new_val}\n"
-                            else:
-                                result += f"- {field}: {change}\n"
+                        section = f"## {char.name} Changes:\n" + _change_lines(diff["characters"][target])
                     else:
-                        result += f"No changes for character '{target}'.\n"
+                        section = f"No changes for character '{target}'.\n"
                 else:
-                    result += "Invalid target. Use 'world' or a valid character_id.\n"
+                    section = "Invalid target. Use 'world' or a valid character_id.\n"
                 
                 # Also show relationship changes
+                relationships = ""
                 if diff["relationships"]:
-                    result += "\n## Relationship Changes:\n"
-                    for rel_key, (old_val, new_val) in diff["relationships"].items():
-                        result += f"- {rel_key}: {old_val} → {new_val}\n"
+                    relationships = "\n## Relationship Changes:\n" + _change_lines(diff["relationships"])
                 
-                return result
+                return _STATE_DIFF_TEMPLATE.substitute(
+                    from_step=from_step, to_step=to_step, thread_id=thread_id,
+                    target_section=section, relationship_section=relationships,
+                )
                 
             except Exception as e:
-                return f"Error explaining state change: {str(e)}"
+                return _tool_error("state_diff_failed", str(e))
+        
+        def embed_query(query: str):
+            """Query embedding for the semantic result cache and the search"""
+            vector_db = search_service.vector_db
+            if not vector_db or not vector_db.is_available():
+                return None
+            return vector_db.embed_text(query)
         
         # ===== RAG Tool =====
-        @tool
+        # The RAG and analysis tools hit the vector DB / LLM, so they also get
+        # coroutine implementations: the tool node awaits them
+        # concurrently instead of tying up a worker thread per call.
+        @_cached_tool(project, "search_story_context", embed=embed_query)
         def search_story_context(query: str) -> str:
             """Search the entire story database for relevant context about characters, scenes, and worldview.
             
@@ -279,15 +855,32 @@ class LangGraphAgentService:
                 Formatted context with relevant characters and scenes
             """
             try:
-                context = search_service.get_contextual_summary(project, query)
-                if not context or len(context) < 50:
-                    return "No relevant context found. Try rephrasing your query."
-                return context
+                return _context_or_hint(search_service.get_contextual_summary(
+                    project, query, query_embedding=_tool_call_embedding.get()
+                ))
             except Exception as e:
-                return f"Error searching context: {str(e)}"
+                return _tool_error("context_search_failed", str(e))
+        
+        @_cached_tool(project, "search_story_context", embed=embed_query)
+        async def asearch_story_context(query: str) -> str:
+            try:
+                return _context_or_hint(await search_service.aget_contextual_summary(
+                    project, query, query_embedding=_tool_call_embedding.get()
+                ))
+            except Exception as e:
+                return _tool_error("context_search_failed", str(e))
+        
+        def _context_or_hint(context: str) -> str:
+            if not context or len(context) < 50:
+                return "No relevant context found. Try rephrasing your query."
+            return context
+        
+        search_story_context = StructuredTool.from_function(
+            func=search_story_context, coroutine=asearch_story_context
+        )
         
         # ===== NEW: Scene Analysis Tool =====
-        @tool
+        @_cached_tool(project, "analyze_scene")
         def analyze_scene(scene_id: str) -> str:
             """Perform comprehensive analysis on a specific scene.
             
@@ -311,179 +904,199 @@ class LangGraphAgentService:
             try:
                 scene = project.scenes.get(scene_id)
                 if not scene:
-                    available = ', '.join(list(project.scenes.keys())[:10])
-                    return f"Scene '{scene_id}' not found. Available scene IDs (first 10): {available}"
+                    return _scene_not_found(scene_id)
                 
-                result = f"# Scene Analysis: {scene.title}\n\n"
-                result += f"**ID:** {scene_id}\n"
-                if scene.chapter:
-                    result += f"**Chapter:** {scene.chapter}\n"
-                result += "\n---\n\n"
-                
-                # Generate summary
-                result += "## 📝 Summary\n\n"
                 if scene.summary:
-                    result += f"{scene.summary}\n\n"
+                    summary = scene.summary
+                    facts = ai_service.extract_facts(project, scene)
                 else:
-                    summary = ai_service.summarize_scene(project, scene)
-                    result += f"{summary}\n\n"
-                    result += "*（AI Generated）*\n\n"
-                
-                # Extract facts
-                result += "## 🌍 Extracted Facts & Plot Points\n\n"
-                facts = ai_service.extract_facts(project, scene)
-                if facts and not facts[0].startswith("Error"):
-                    for fact in facts:
-                        result += f"- {fact}\n"
-                else:
-                    result += "*(No facts extracted)*\n"
-                
-                result += "\n---\n\n"
+                    # One LLM call for both, sending the scene body once
+                    analysis = ai_service.analyze_scene_combined(project, scene)
+                    summary, facts = analysis["summary"], analysis["facts"]
+                return _scene_analysis_report(scene, summary, facts)
                 
-                # Scene metadata
-                result += "## 📊 Scene Metadata\n\n"
-                result += f"- **Choices:** {len(scene.choices)} options\n"
-                if scene.tags:
-                    result += f"- **Tags:** {', '.join(scene.tags)}\n"
-                if scene.participants:
-                    char_names = []
-                    for p in scene.participants:
-                        char = project.characters.get(p.characterId)
-                        if char:
-                            char_names.append(char.name)
-                    if char_names:
-                        result += f"- **Characters:** {', '.join(char_names)}\n"
+            except Exception as e:
+                return _tool_error("scene_analysis_failed", str(e))
+        
+        @_cached_tool(project, "analyze_scene")
+        async def aanalyze_scene(scene_id: str) -> str:
+            try:
+                scene = project.scenes.get(scene_id)
+                if not scene:
+                    return _scene_not_found(scene_id)
                 
-                return result
+                if scene.summary:
+                    summary = scene.summary
+                    facts = await ai_service.aextract_facts(project, scene)
+                else:
+                    # One LLM call for both, sending the scene body once
+                    analysis = await ai_service.aanalyze_scene_combined(project, scene)
+                    summary, facts = analysis["summary"], analysis["facts"]
+                return _scene_analysis_report(scene, summary, facts)
                 
             except Exception as e:
-                return f"Error analyzing scene: {str(e)}"
+                return _tool_error("scene_analysis_failed", str(e))
+        
+        def _scene_not_found(scene_id: str) -> str:
+            available = project.derived(
+                "scene_id_sample",
+                lambda: _bounded_csv(project.scenes.keys(), _ERROR_SAMPLE_SIZE),
+            )
+            return f"Scene '{scene_id}' not found. Available scene IDs: {available}"
+        
+        def _scene_analysis_report(scene, summary: str, facts: list) -> str:
+            parts = [f"# Scene Analysis: {scene.title}\n\n"]
+            parts.append(f"**ID:** {scene.id}\n")
+            if scene.chapter:
+                parts.append(f"**Chapter:** {scene.chapter}\n")
+            parts.append("\n---\n\n")
+            
+            # Summary
+            parts.append("## 📝 Summary\n\n")
+            parts.append(f"{summary}\n\n")
+            if not scene.summary:
+                parts.append("*（AI Generated）*\n\n")
+            
+            # Extracted facts
+            parts.append("## 🌍 Extracted Facts & Plot Points\n\n")
+            if facts and not facts[0].startswith("Error"):
+                for fact in facts:
+                    parts.append(f"- {fact}\n")
+            else:
+                parts.append("*(No facts extracted)*\n")
+            
+            parts.append("\n---\n\n")
+            
+            # Scene metadata
+            parts.append("## 📊 Scene Metadata\n\n")
+            parts.append(f"- **Choices:** {len(scene.choices)} options\n")
+            if scene.tags:
+                parts.append(f"- **Tags:** {', '.join(scene.tags)}\n")
+            if scene.participants:
+                char_names = _participant_names(project, scene)
+                if char_names:
+                    parts.append(f"- **Characters:** {', '.join(char_names)}\n")
+            
+            return "".join(parts)
+        
+        analyze_scene = StructuredTool.from_function(
+            func=analyze_scene, coroutine=aanalyze_scene
+        )
         
         # ===== Original Basic Query Tools =====
         
         @tool
+        @_cached_tool(project)
         def get_all_characters() -> str:
             """Get a list of all characters in the story. Use when user asks '现在整个故事中有几个角色？', 'How many characters?', '列出所有角色', etc."""
             chars = list(project.characters.values())
             if not chars:
                 return "No characters found."
             
-            result = f"Total: {len(chars)} characters\n\n"
+            parts = [f"Total: {len(chars)} characters\n\n"]
             for char in chars:
                 alias = f" (aka {char.alias})" if char.alias else ""
                 traits = f"\nTraits: {', '.join(char.traits[:3])}" if char.traits else ""
-                result += f"• {char.name}{alias}{traits}\n"
+                parts.append(f"• {char.name}{alias}{traits}\n")
                 if char.description:
-                    desc = char.description[:100] + "..." if len(char.description) > 100 else char.description
-                    result += f"  {desc}\n"
-                result += "\n"
-            return result
+                    desc = _truncate(char.description, _LISTING_PREVIEW_CHARS)
+                    parts.append(f"  {desc}\n")
+                parts.append("\n")
+            return "".join(parts)
         
         @tool
+        @_cached_tool(project)
         def get_character_by_name(name: str) -> str:
             """Get detailed information about a specific character. Use when user asks about a specific character like '陈墨是谁？', 'Who is Chen Mo?', '告诉我关于林雪薇的信息', etc.
             
             Args:
                 name: Character name or alias to search for
             """
-            name_lower = name.lower()
-            for char in project.characters.values():
-                if (char.name.lower() == name_lower or 
-                    (char.alias and char.alias.lower() == name_lower)):
-                    result = f"**{char.name}**\n"
-                    if char.alias:
-                        result += f"Alias: {char.alias}\n"
-                    if char.description:
-                        result += f"\n{char.description}\n"
-                    if char.traits:
-                        result += f"\nTraits: {', '.join(char.traits)}\n"
-                    if char.goals:
-                        result += f"\nGoals: {', '.join(char.goals)}\n"
-                    if char.relationships:
-                        result += f"\nRelationships:\n"
-                        for rel in char.relationships:
-                            result += f"  • {rel.targetId}: {rel.summary}\n"
-                    return result
-            available = ', '.join(c.name for c in project.characters.values())
+            char = project.find_character(name)
+            if char:
+                parts = [f"**{char.name}**\n"]
+                if char.alias:
+                    parts.append(f"Alias: {char.alias}\n")
+                if char.description:
+                    parts.append(f"\n{char.description}\n")
+                if char.traits:
+                    parts.append(f"\nTraits: {', '.join(char.traits)}\n")
+                if char.goals:
+                    parts.append(f"\nGoals: {', '.join(char.goals)}\n")
+                if char.relationships:
+                    parts.append(f"\nRelationships:\n")
+                    for rel in char.relationships:
+                        parts.append(f"  • {rel.targetId}: {rel.summary}\n")
+                return "".join(parts)
+            available = project.derived(
+                "character_name_sample",
+                lambda: _bounded_csv((c.name for c in project.characters.values()), _ERROR_SAMPLE_SIZE),
+            )
             return f"Character '{name}' not found. Available: {available}"
         
         @tool
+        @_cached_tool(project)
         def get_all_scenes() -> str:
             """Get a list of all scenes in the story. Use when user asks '有哪些场景？', 'What scenes are there?', '故事有多少章节？', etc."""
             scenes = list(project.scenes.values())
             if not scenes:
                 return "No scenes found."
             
-            result = f"Total: {len(scenes)} scenes\n\n"
-            chapters = {}
-            for scene in scenes:
-                chapter = scene.chapter or "No Chapter"
-                if chapter not in chapters:
-                    chapters[chapter] = []
-                chapters[chapter].append(scene)
-            
-            for chapter, scene_list in sorted(chapters.items()):
-                result += f"\n**{chapter}**\n"
+            parts = [f"Total: {len(scenes)} scenes\n\n"]
+            for chapter, scene_list in project.get_scenes_by_chapter().items():
+                parts.append(f"\n**{chapter}**\n")
                 for scene in scene_list:
-                    result += f"{scene.id}. {scene.title}\n"
+                    parts.append(f"{scene.id}. {scene.title}\n")
                     if scene.summary:
-                        summary = scene.summary[:100] + "..." if len(scene.summary) > 100 else scene.summary
-                        result += f"   {summary}\n"
-            return result
+                        summary = _truncate(scene.summary, _LISTING_PREVIEW_CHARS)
+                        parts.append(f"   {summary}\n")
+            return "".join(parts)
         
         @tool
+        @_cached_tool(project)
         def search_scenes(keyword: str) -> str:
             """Search for scenes containing specific keywords. Use when user wants to find scenes about a topic like '哪些场景提到了记忆？', 'Find scenes about police', etc.
             
             Args:
                 keyword: Keyword to search for in scene titles, summaries, and content
             """
-            keyword_lower = keyword.lower()
-            matches = []
-            
-            for scene in project.scenes.values():
-                if (keyword_lower in scene.title.lower() or
-                    (scene.summary and keyword_lower in scene.summary.lower()) or
-                    (scene.body and keyword_lower in scene.body.lower()) or
-                    any(keyword_lower in tag.lower() for tag in scene.tags)):
-                    matches.append(scene)
+            matches = get_scene_index(project).search(keyword.lower())
             
             if not matches:
                 return f"No scenes found containing '{keyword}'."
             
-            result = f"Found {len(matches)} scene(s) with '{keyword}':\n\n"
+            parts = [f"Found {len(matches)} scene(s) with '{keyword}':\n\n"]
             for scene in matches:
-                result += f"• {scene.id}. {scene.title}\n"
+                parts.append(f"• {scene.id}. {scene.title}\n")
                 if scene.chapter:
-                    result += f"  Chapter: {scene.chapter}\n"
-            return result
+                    parts.append(f"  Chapter: {scene.chapter}\n")
+            return "".join(parts)
         
         @tool
+        @_cached_tool(project)
         def count_endings() -> str:
             """Count how many endings the story has. Use when user asks '这个故事有几个结局？', 'How many endings?', '有哪些结局？', etc."""
-            endings = [s for s in project.scenes.values()
-                       if not s.choices or all(not c.nextSceneId for c in s.choices)]
+            endings = [project.scenes[scene_id] for scene_id in project.get_ending_ids()]
             
             if not endings:
                 return "No clear endings found."
             
-            result = f"Found {len(endings)} ending(s):\n"
+            parts = [f"Found {len(endings)} ending(s):\n"]
             for scene in endings:
-                result += f"• {scene.id}. {scene.title}\n"
-            return result
+                parts.append(f"• {scene.id}. {scene.title}\n")
+            return "".join(parts)
         
         @tool
+        @_cached_tool(project)
         def get_world_facts() -> str:
             """Get world-building facts and lore. Use when user asks about story setting, worldview, or background like '这个故事的世界观是什么？', 'What is the setting?', etc."""
-            facts = getattr(project.worldState, 'facts', [])
+            facts = project.worldState.facts
             if not facts:
                 return "No world facts have been extracted yet."
             
-            result = f"World Facts ({len(facts)} total):\n\n"
-            for fact in facts:
-                content = fact.content if hasattr(fact, 'content') else str(fact)
-                result += f"• {content}\n"
-            return result
+            parts = [f"World Facts ({len(facts)} total):\n\n"]
+            parts.extend(f"• {fact.content}\n" for fact in facts.values())
+            return "".join(parts)
         
         return [
             # State query tools (NEW - highest priority for dynamic character analysis)
@@ -502,12 +1115,30 @@ class LangGraphAgentService:
             get_world_facts,
         ]
     
-    def _build_graph(self):
-        """Build LangGraph agent workflow with intent classification"""
+    @classmethod
+    def _build_graph(cls):
+        """
+        Build LangGraph agent workflow with intent classification
+        
+        The graph holds no per-project state: nodes find the service that
+        is running them under config["configurable"]["agent_service"], so
+        one compiled graph serves every instance (see _compiled_graph).
+        """
         
         # Define intent classification node
-        def classify_intent(state: MessagesState) -> dict:
-            """Classify user intent: 'chat' or 'qa'"""
+        async def classify_intent(state: AgentState, config: RunnableConfig) -> dict:
+            """
+            Classify user intent: 'chat' or 'qa'
+            
+            Keyword rules decide first, then the local embedding classifier;
+            only messages neither is confident about reach the LLM classifier.
+            Most messages are 'qa', so the QA agent's first LLM call is fired
+            speculatively alongside the classifier; its reply is kept for
+            qa_agent when the intent is 'qa' and cancelled otherwise.
+            Canonical queries are not speculated on, since tool_dispatch
+            answers them without that call.
+            """
+            service = _agent_service(config)
             messages = state["messages"]
             
             # Get last user message
@@ -520,6 +1151,21 @@ class LangGraphAgentService:
             if not last_user_msg:
                 return {"intent": "chat"}
             
+            # Keyword rules settle most messages without the classifier LLM
+            intent = _rule_intent(" ".join(last_user_msg.split()).lower())
+            if intent:
+                return {"intent": intent}
+            
+            # Then the local embedding classifier; the LLM only breaks ties
+            classifier = get_intent_classifier(service.search_service.vector_db)
+            if classifier is not None:
+                try:
+                    intent, confidence = await asyncio.to_thread(classifier.predict, last_user_msg)
+                    if confidence >= _LOCAL_INTENT_MIN_CONFIDENCE:
+                        return {"intent": intent}
+                except Exception:
+                    pass
+            
             # Simple classification prompt
             classification_prompt = f"""Classify the user's intent as either 'chat' or 'qa':
 
@@ -533,59 +1179,91 @@ User message: "{last_user_msg}"
 
 Respond with ONLY ONE WORD: either 'qa' or 'chat'"""
 
+            speculation = None
+            if _dispatch_tool_call(last_user_msg, service.project) is None:
+                speculation = asyncio.create_task(
+                    service.llm_with_tools.ainvoke(
+                        [service._system_message(service._get_qa_system_prompt())] + messages
+                    )
+                )
+            
             try:
-                response = self.classifier_llm.invoke([HumanMessage(content=classification_prompt)])
+                response = await service.classifier_llm.ainvoke([HumanMessage(content=classification_prompt)])
                 intent = response.content.strip().lower()
                 
                 # Validate response
                 if intent not in ['qa', 'chat']:
                     # Default to qa for ambiguous cases (safer)
                     intent = 'qa'
-                
-                # Store intent in state metadata
-                return {"intent": intent}
-            except:
+            except Exception:
                 # Fallback to qa mode
-                return {"intent": "qa"}
+                intent = 'qa'
+            
+            if speculation is None:
+                return {"intent": intent}
+            if intent != 'qa':
+                speculation.cancel()
+                return {"intent": intent}
+            try:
+                # qa_agent falls back to a fresh call if speculation failed
+                return {"intent": intent, "speculative": await speculation}
+            except Exception:
+                return {"intent": intent}
+        
+        def tool_dispatch_node(state: AgentState, config: RunnableConfig):
+            """Emit the tool call for canonical queries without asking the LLM"""
+            service = _agent_service(config)
+            last = state["messages"][-1]
+            if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+                return {}
+            
+            tool_call = _dispatch_tool_call(last.content, service.project)
+            if tool_call is None:
+                return {}
+            return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+        
+        def after_dispatch(state: AgentState) -> Literal["tools", "qa_agent"]:
+            """Run the dispatched tool directly, or fall through to the QA agent"""
+            last_message = state["messages"][-1]
+            if isinstance(last_message, AIMessage) and last_message.tool_calls:
+                return "tools"
+            return "qa_agent"
         
         # Define QA agent node (with tools)
-        def qa_agent_node(state: MessagesState):
+        async def qa_agent_node(state: AgentState, config: RunnableConfig):
             """QA agent with full tool access for factual queries"""
-            messages = state["messages"]
-            
-            # Add system prompt if needed
-            if not messages or not any(isinstance(m, SystemMessage) for m in messages):
-                system_msg = SystemMessage(content=self._get_qa_system_prompt())
-                messages = [system_msg] + messages
+            service = _agent_service(config)
+            messages, rewrite = service._inject_system_prompt(state, service._get_qa_system_prompt())
             
-            # Call LLM with all tools
-            response = self.llm_with_tools.invoke(messages)
+            # First hop of the turn: use the reply prefetched by classify_intent
+            speculative = state.get("speculative")
+            if speculative is not None and isinstance(messages[-1], HumanMessage):
+                response = speculative
+            else:
+                # Call LLM with all tools
+                response = await service.llm_with_tools.ainvoke(messages)
             
-            return {"messages": [response]}
+            return {"messages": rewrite + [response], "speculative": None, "system_injected": True}
         
         # Define chat agent node (lightweight, minimal tools)
-        def chat_agent_node(state: MessagesState):
+        async def chat_agent_node(state: AgentState, config: RunnableConfig):
             """Chat agent for discussions and brainstorming"""
-            messages = state["messages"]
-            
-            # Add system prompt if needed
-            if not messages or not any(isinstance(m, SystemMessage) for m in messages):
-                system_msg = SystemMessage(content=self._get_chat_system_prompt())
-                messages = [system_msg] + messages
+            service = _agent_service(config)
+            messages, rewrite = service._inject_system_prompt(state, service._get_chat_system_prompt())
             
             # Use LLM without tools (or with minimal tools)
             # For now, reuse the same tools but with different prompting
-            response = self.llm_with_tools.invoke(messages)
+            response = await service.llm_with_tools.ainvoke(messages)
             
-            return {"messages": [response]}
+            return {"messages": rewrite + [response], "system_injected": True}
         
         # Define routing logic
-        def route_by_intent(state: MessagesState) -> Literal["qa_agent", "chat_agent"]:
+        def route_by_intent(state: AgentState) -> Literal["qa_agent", "chat_agent"]:
             """Route to appropriate agent based on intent"""
             intent = state.get("intent", "qa")
             return "qa_agent" if intent == "qa" else "chat_agent"
         
-        def should_continue(state: MessagesState) -> Literal["tools", END]:
+        def should_continue(state: AgentState) -> Literal["tools", END]:
             """Decide whether to call tools or end"""
             last_message = state["messages"][-1]
             
@@ -596,17 +1274,54 @@ Respond with ONLY ONE WORD: either 'qa' or 'chat'"""
             # Otherwise, end
             return END
         
-        # Create tool node
-        tool_node = ToolNode(self.tools)
+        def after_tools(state: AgentState) -> Literal["qa_agent", "tool_error"]:
+            """Skip the LLM round-trip when every tool call of this round failed"""
+            results = []
+            for msg in reversed(state["messages"]):
+                if not isinstance(msg, ToolMessage):
+                    break
+                results.append(msg)
+            
+            if results and all(_is_tool_error(msg) for msg in results):
+                return "tool_error"
+            return "qa_agent"
+        
+        def tool_error_node(state: AgentState):
+            """Reply with a canned apology instead of asking the LLM to parse errors"""
+            return {"messages": [AIMessage(content=TOOL_ERROR_REPLY)]}
+        
+        async def parallel_tool_node(state: AgentState, config: RunnableConfig):
+            """Run every tool call of the last AI message concurrently"""
+            service = _agent_service(config)
+            tool_calls = state["messages"][-1].tool_calls
+            results = await asyncio.gather(
+                *(service._invoke_tool_async(tc, config) for tc in tool_calls),
+                return_exceptions=True,
+            )
+            
+            messages = []
+            for tc, result in zip(tool_calls, results):
+                if isinstance(result, BaseException):
+                    # One failing tool must not take down the rest of the round
+                    result = ToolMessage(
+                        content=_tool_error("tool_failed", str(result)),
+                        name=tc["name"],
+                        tool_call_id=tc["id"],
+                        status="error",
+                    )
+                messages.append(result)
+            return {"messages": messages}
         
         # Build the graph with intent classification
-        workflow = StateGraph(MessagesState)
+        workflow = StateGraph(AgentState)
         
         # Add nodes
         workflow.add_node("classify", classify_intent)
+        workflow.add_node("tool_dispatch", tool_dispatch_node)
         workflow.add_node("qa_agent", qa_agent_node)
         workflow.add_node("chat_agent", chat_agent_node)
-        workflow.add_node("tools", tool_node)
+        workflow.add_node("tools", parallel_tool_node)
+        workflow.add_node("tool_error", tool_error_node)
         
         # Add edges
         workflow.add_edge(START, "classify")  # Start with classification
@@ -614,11 +1329,22 @@ Respond with ONLY ONE WORD: either 'qa' or 'chat'"""
             "classify",
             route_by_intent,
             {
-                "qa_agent": "qa_agent",
+                "qa_agent": "tool_dispatch",
                 "chat_agent": "chat_agent"
             }
         )
         
+        # Canonical queries go straight to their tool; the QA agent then
+        # only has to format the result
+        workflow.add_conditional_edges(
+            "tool_dispatch",
+            after_dispatch,
+            {
+                "tools": "tools",
+                "qa_agent": "qa_agent"
+            }
+        )
+        
         # QA agent can use tools
         workflow.add_conditional_edges(
             "qa_agent",
@@ -640,67 +1366,124 @@ Respond with ONLY ONE WORD: either 'qa' or 'chat'"""
         )
         
         # After tool execution, go back to appropriate agent
-        # For simplicity, always return to qa_agent after tools
-        workflow.add_edge("tools", "qa_agent")
+        # For simplicity, always return to qa_agent after tools,
+        # unless every tool call failed
+        workflow.add_conditional_edges(
+            "tools",
+            after_tools,
+            {
+                "qa_agent": "qa_agent",
+                "tool_error": "tool_error"
+            }
+        )
+        workflow.add_edge("tool_error", END)
         
         # Compile
         return workflow.compile()
     
+    async def _invoke_tool_async(self, tool_call: dict, config: RunnableConfig) -> ToolMessage:
+        """
+        Run one tool call, returning its ToolMessage
+        
+        Tools with a coroutine (search_story_context, analyze_scene) are
+        awaited directly; sync-only tools run in the default executor.
+        """
+        tool_obj = self._tools_by_name.get(tool_call["name"])
+        if tool_obj is None:
+            return ToolMessage(
+                content=_tool_error("unknown_tool", f"Tool '{tool_call['name']}' does not exist"),
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+        # Invoking with the full ToolCall makes the tool return a ToolMessage
+        return await tool_obj.ainvoke({**tool_call, "type": "tool_call"}, config)
+    
+    def _inject_system_prompt(self, state: AgentState, prompt: str) -> tuple:
+        """
+        Messages to send to the LLM, plus the state rewrite that stores them
+        
+        On the first agent hop of a turn the system prompt is written into
+        the state as the first message (the list is cleared and re-added so it
+        lands in front), and ``system_injected`` is set. Later hops after tool
+        rounds then send the state's list as-is: no scan for an existing
+        prompt, and an unchanged prefix for provider prompt caching.
+        
+        Returns:
+            (llm_messages, messages_update_prefix)
+        """
+        messages = state["messages"]
+        if state.get("system_injected"):
+            return messages, []
+        messages = [self._system_message(prompt)] + messages
+        return messages, [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + messages
+    
+    def _system_message(self, prompt: str) -> SystemMessage:
+        """
+        Wrap a system prompt, flagging it for provider prefix caching
+        
+        The system prompt is always the first message and identical across
+        turns, so providers that support it can reuse its KV cache. The
+        message object itself is cached per prompt too.
+        """
+        return _cached_system_message(prompt, _supports_prompt_caching(self.model))
+    
     def _get_qa_system_prompt(self) -> str:
         """Get system prompt for QA agent (factual queries)"""
-        return f"""You are a professional story database assistant for the interactive fiction project "{self.project.name}".
-
-Your role is to provide ACCURATE, FACTUAL answers about this story by using the available tools.
-
-IMPORTANT RULES:
-1. When user asks factual questions, ALWAYS use tools to get accurate information
-2. Do NOT make up or hallucinate information
-3. If you can't find information with tools, say so clearly
-4. Prioritize using 'search_story_context' for general queries about worldview, lore, or background
-5. Use 'analyze_scene' when user asks to analyze or review a specific scene
-6. Use specific query tools (get_character_by_name, search_scenes, etc.) for targeted lookups
-
-Available tools:
-- search_story_context(query) - **Use this FIRST for most questions** - Semantic search across all story content
-- analyze_scene(scene_id) - Comprehensive scene analysis with AI-generated summary and fact extraction
-- get_all_characters() - List all characters
-- get_character_by_name(name) - Get character details
-- get_all_scenes() - List all scenes
-- search_scenes(keyword) - Find scenes by keyword
-- count_endings() - Count story endings
-- get_world_facts() - Get extracted world lore
-
-Current project: {self.project.name}
-Total characters: {len(self.project.characters)}
-Total scenes: {len(self.project.scenes)}
-
-Respond in the same language as the user's question (Chinese or English)."""
+        return _qa_system_prompt(
+            self.project.name, len(self.project.characters), len(self.project.scenes)
+        )
 
     def _get_chat_system_prompt(self) -> str:
         """Get system prompt for chat agent (discussions and brainstorming)"""
-        return f"""You are a creative writing consultant for the interactive fiction project "{self.project.name}".
-
-Your role is to DISCUSS, BRAINSTORM, and provide SUGGESTIONS about story development.
-
-IMPORTANT RULES:
-1. You can ask clarifying questions
-2. Provide constructive feedback and creative suggestions
-3. You MAY use tools if you need to check facts, but prioritize conversation
-4. Be encouraging and supportive of the writer's creative process
-5. Help identify potential plot holes or character inconsistencies
-
-When discussing:
-- Story structure and pacing
-- Character development arcs
-- Narrative themes and motifs
-- Player choices and branching logic
-- Emotional impact and player engagement
-
-Current project: {self.project.name}
-Locale: {self.project.locale}
-
-Respond in the same language as the user's question (Chinese or English)."""
+        return _chat_system_prompt(self.project.name, self.project.locale)
 
+    def _trim_history(self, history: list) -> tuple:
+        """
+        Split history into (recent turns, summary of older turns)
+        
+        Older turns are trimmed in whole windows, so the summarized prefix only
+        changes every HISTORY_WINDOW_TURNS turns and its cached summary is
+        reused in between.
+        
+        Returns:
+            (recent_history, summary_text_or_None)
+        """
+        window = self.HISTORY_WINDOW_TURNS * 2
+        if len(history) <= window:
+            return history, None
+        
+        cut = (len(history) - window) // window * window
+        if cut == 0:
+            return history, None
+        
+        summary = self._summarize_history(history[:cut])
+        if summary is None:
+            # Summarization failed: fall back to sending the full history
+            return history, None
+        return history[cut:], summary
+    
+    def _summarize_history(self, older: list) -> Optional[str]:
+        """Summarize trimmed turns, reusing a cached summary when possible"""
+        turns = [turn for turn in map(_history_turn, older) if turn]
+        key = hashlib.sha1(
+            json.dumps(turns, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        
+        cache = LangGraphAgentService._summary_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        
+        summary = self.ai_service.summarize_conversation(self.project, turns)
+        if not summary or summary.startswith("Error"):
+            return None
+        
+        cache[key] = summary
+        if len(cache) > self._SUMMARY_CACHE_SIZE:
+            cache.popitem(last=False)
+        return summary
+    
     def _get_system_prompt(self) -> str:
         """Legacy system prompt (fallback)"""
         return self._get_qa_system_prompt()
@@ -711,7 +1494,9 @@ Respond in the same language as the user's question (Chinese or English)."""
         
         Args:
             user_message: User's question
-            history: Previous chat history (list of dicts with 'role' and 'content')
+            history: Previous chat history, either dicts with 'role' and 'content'
+                or LangChain messages. Converted dict entries are cached on the
+                dicts, so pass the same list objects across turns.
             
         Returns:
             {
@@ -720,51 +1505,105 @@ Respond in the same language as the user's question (Chinese or English)."""
                 "total_rounds": 3
             }
         """
+        return run_sync(self.achat(user_message, history))
+    
+    async def achat(self, user_message: str, history: list = None):
+        """
+        Async variant of chat()
+        
+        The graph nodes are async (the classifier and the QA agent's first
+        call run concurrently), so this is the primary entry point; the RAG
+        and scene-analysis tools use their coroutine implementations and
+        tool calls in one round are awaited concurrently. Same arguments and
+        return value as chat().
+        """
+        # History summarization may call the LLM synchronously
+        recent, summary = await asyncio.to_thread(self._trim_history, history or [])
+        messages = self._build_messages(user_message, recent, summary)
+        result = await self.agent.ainvoke({"messages": messages}, self._run_config())
+        return self._format_result(result)
+    
+    async def achat_stream(self, user_message: str, history: list = None):
+        """
+        Streaming variant of achat()
+        
+        Async generator yielding, as they happen:
+        - {"type": "token", "content": delta} for each token of the agents'
+          replies
+        - the "thinking" / "tool_call" / "tool_result" step dicts of achat()'s
+          "steps", as each graph node finishes
+        then one {"type": "final", "response", "steps", "total_rounds"} event
+        with the same fields achat() returns. Tokens of the classifier and of
+        the speculative QA call are not streamed; a speculative reply that is
+        used arrives whole in the final event.
+        """
+        recent, summary = await asyncio.to_thread(self._trim_history, history or [])
+        messages = self._build_messages(user_message, recent, summary)
+        
+        final_state = None
+        round_count = 0
+        async for event in self.agent.astream_events(
+            {"messages": messages}, self._run_config(), version="v2"
+        ):
+            kind = event["event"]
+            node = event["metadata"].get("langgraph_node")
+            if kind == "on_chat_model_stream":
+                if node not in _STREAMED_NODES:
+                    continue
+                content = event["data"]["chunk"].content
+                if content and isinstance(content, str):
+                    yield {"type": "token", "content": content}
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                # End of the root run: its output is the final graph state
+                final_state = event["data"]["output"]
+            elif kind == "on_chain_end" and event["name"] == node:
+                output = event["data"].get("output")
+                if not isinstance(output, dict) or not output.get("messages"):
+                    continue
+                new_messages = output["messages"]
+                if node in _STREAMED_NODES:
+                    # Agent nodes may re-add earlier messages when writing the
+                    # system prompt; only their last message is new
+                    new_messages = new_messages[-1:]
+                for msg in new_messages:
+                    if isinstance(msg, AIMessage) and msg.tool_calls:
+                        round_count += 1
+                    for step in _message_steps(msg, round_count):
+                        yield step
+        
+        yield {"type": "final", **self._format_result(final_state)}
+    
+    def _build_messages(self, user_message: str, recent: list, summary: Optional[str]) -> list:
+        """Graph input: optional history summary, recent turns, then the new message"""
         # Convert history to LangChain message format
         messages = []
-        if history:
-            for msg in history:
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    messages.append(AIMessage(content=msg["content"]))
+        if summary:
+            messages.append(SystemMessage(
+                content=f"[Earlier conversation summary]: {summary}",
+                name=_SUMMARY_MESSAGE_NAME,
+            ))
+        messages.extend(m for m in map(_history_message, recent) if m is not None)
         
         # Add current message
         messages.append(HumanMessage(content=user_message))
         
-        # Invoke agent
-        result = self.agent.invoke({"messages": messages})
-        
-        # Extract steps and final response
+        return messages
+    
+    def _format_result(self, result: dict) -> dict:
+        """Extract steps and the final answer from the graph's final state"""
         steps = []
         round_count = 0
         final_response = ""
         
         for msg in result["messages"]:
             if isinstance(msg, AIMessage):
-                if hasattr(msg, 'tool_calls') and msg.tool_calls:
+                if msg.tool_calls:
                     # Agent decided to use tools
                     round_count += 1
-                    steps.append({
-                        "type": "thinking",
-                        "content": f"🤔 Thinking... (Round {round_count})"
-                    })
-                    for tc in msg.tool_calls:
-                        steps.append({
-                            "type": "tool_call",
-                            "tool": tc["name"],
-                            "args": tc.get("args", {})
-                        })
                 else:
                     # Final response
                     final_response = msg.content
-            elif isinstance(msg, ToolMessage):
-                # Tool result
-                steps.append({
-                    "type": "tool_result",
-                    "tool": msg.name,
-                    "content": msg.content[:500] + "..." if len(msg.content) > 500 else msg.content
-                })
+            steps.extend(_message_steps(msg, round_count))
         
         return {
             "response": final_response,
@@ -0,0 +1,163 @@
+"""
+Scene Keyword Index - prefilters for substring keyword search
+
+Keywords of three or more characters are looked up in an in-memory SQLite
+FTS5 table using the trigram tokenizer, which indexes every substring of
+length three and so answers substring queries from posting lists.
+
+Shorter keywords (common for Chinese, e.g. "记忆") use a bitmap of hashed
+character bigrams (scenes x buckets): a keyword can only occur in a scene
+whose bitmap contains every bigram of the keyword, so a single NumPy column
+lookup narrows the scan to a handful of candidates.
+
+Candidates are always verified with the exact substring test, so results are
+identical to a full scan.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import re
+import sqlite3
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # NumPy missing: fall back to scanning every scene
+    np = None
+
+from ..models.project import Project
+from ..models.scene import Scene
+
+
+# Number of hash buckets for character bigrams (power of two)
+N_BUCKETS = 1 << 12
+
+# The trigram tokenizer only matches keywords at least this long
+FTS_MIN_KEYWORD = 3
+
+# Joins a scene's fields into one searchable string; story text never
+# contains NUL, so no match can span two fields
+FIELD_SEP = "\x00"
+
+
+def _open_fts(fields: List[List[str]]) -> Optional[sqlite3.Connection]:
+    """In-memory FTS5 trigram table of (text, row), or None if unsupported"""
+    try:
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute(
+            "CREATE VIRTUAL TABLE scene_text USING fts5(text, row UNINDEXED, tokenize='trigram')"
+        )
+    except sqlite3.Error:
+        # SQLite built without FTS5, or older than 3.34 (no trigram tokenizer)
+        return None
+    # One FTS row per field so a match never spans two fields
+    conn.executemany(
+        "INSERT INTO scene_text (text, row) VALUES (?, ?)",
+        ((text, row) for row, texts in enumerate(fields) for text in texts),
+    )
+    return conn
+
+
+@lru_cache(maxsize=64)
+def _alternation(keywords: Tuple[str, ...]) -> "re.Pattern":
+    """Compiled regex matching any of keywords literally"""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+def _bigram_buckets(text: str) -> set:
+    """Hashed bucket ids of all character bigrams in text"""
+    mask = N_BUCKETS - 1
+    return {hash(text[i:i + 2]) & mask for i in range(len(text) - 1)}
+
+
+class SceneKeywordIndex:
+    """FTS5 trigram table and bigram bitmap over a project's scenes for fast candidate lookup"""
+
+    def __init__(self, scenes: List[Scene]):
+        self.scenes = scenes
+        # Lowercased searchable fields per scene, computed once per revision
+        fields = [
+            [text.lower() for text in (scene.title, scene.summary, scene.body, *scene.tags) if text]
+            for scene in scenes
+        ]
+        # One string per scene, so verifying a candidate is a single
+        # substring test instead of a loop over its fields
+        self._text = [FIELD_SEP.join(texts) for texts in fields]
+        self._bits = None
+        self._fts = _open_fts(fields)
+        # parallel_tool_node runs tools on worker threads; serialize FTS queries
+        self._fts_lock = threading.Lock()
+
+        if np is None:
+            return
+
+        bits = np.zeros((len(scenes), N_BUCKETS), dtype=bool)
+        for row, texts in enumerate(fields):
+            buckets = set()
+            # Fields are hashed separately so no bigram spans two fields
+            for text in texts:
+                buckets |= _bigram_buckets(text)
+            if buckets:
+                bits[row, list(buckets)] = True
+        self._bits = bits
+
+    def candidates(self, keyword_lower: str) -> List[Scene]:
+        """
+        Scenes that may contain keyword_lower
+
+        Never drops a true match; may include false positives, which the
+        caller filters with an exact substring check.
+        """
+        return [self.scenes[row] for row in self._candidate_rows(keyword_lower)]
+
+    def search(self, keyword_lower: str) -> List[Scene]:
+        """Scenes whose title, summary, body or a tag contains keyword_lower"""
+        if FIELD_SEP in keyword_lower:
+            return []
+        text = self._text
+        return [
+            self.scenes[row] for row in self._candidate_rows(keyword_lower)
+            if keyword_lower in text[row]
+        ]
+
+    def search_any(self, keywords_lower: List[str]) -> List[Scene]:
+        """
+        Scenes containing at least one of keywords_lower, in project order
+        
+        Candidates of all keywords are merged first, and each candidate is
+        verified with one regex pass over its text instead of one substring
+        scan per keyword.
+        """
+        keywords = tuple(k for k in dict.fromkeys(keywords_lower) if k and FIELD_SEP not in k)
+        if not keywords:
+            return []
+        rows = set()
+        for keyword in keywords:
+            rows.update(int(row) for row in self._candidate_rows(keyword))
+        pattern = _alternation(keywords)
+        text = self._text
+        return [self.scenes[row] for row in sorted(rows) if pattern.search(text[row])]
+    
+    def _candidate_rows(self, keyword_lower: str):
+        if self._fts is not None and len(keyword_lower) >= FTS_MIN_KEYWORD:
+            phrase = '"' + keyword_lower.replace('"', '""') + '"'
+            with self._fts_lock:
+                rows = self._fts.execute(
+                    "SELECT DISTINCT row FROM scene_text WHERE scene_text MATCH ? ORDER BY row",
+                    (phrase,),
+                ).fetchall()
+            return [row for (row,) in rows]
+
+        if self._bits is None or len(keyword_lower) < 2:
+            return range(len(self.scenes))
+
+        columns = sorted(_bigram_buckets(keyword_lower))
+        return np.flatnonzero(self._bits[:, columns].all(axis=1))
+
+
+def get_scene_index(project: Project) -> SceneKeywordIndex:
+    """Keyword index for project, rebuilt after each project mutation"""
+    return project.derived(
+        "scene_keyword_index",
+        lambda: SceneKeywordIndex(list(project.scenes.values())),
+    )
@@ -27,6 +27,7 @@ class SceneService:
             chapter=chapter,
         )
         project.scenes[scene.id] = scene
+        project.touch()
         return scene
     
     def get_scene(self, project: Project, scene_id: str) -> Optional[Scene]:
@@ -49,19 +50,36 @@ class SceneService:
             if hasattr(scene, key):
                 setattr(scene, key, value)
         
+        project.touch()
         return scene
     
     def delete_scene(self, project: Project, scene_id: str) -> None:
         """Delete scene"""
-        if scene_id in project.scenes:
-            del project.scenes[scene_id]
+        self.delete_scenes(project, [scene_id])
+    
+    def delete_scenes(self, project: Project, scene_ids: List[str]) -> None:
+        """
+        Delete several scenes at once
         
-        # Clean up choices pointing to this scene
-        for scene in project.scenes.values():
+        Only the scenes with a choice leading to a deleted scene are
+        rewritten, found through the project's incoming-edge index.
+        """
+        deleted = set(scene_ids)
+        incoming = project.get_incoming_scene_ids()
+        sources = {source_id for scene_id in deleted for source_id in incoming.get(scene_id, [])}
+        
+        for scene_id in deleted:
+            project.scenes.pop(scene_id, None)
+        
+        # Clean up choices pointing to the deleted scenes
+        for source_id in sources - deleted:
+            scene = project.scenes[source_id]
             scene.choices = [
                 choice for choice in scene.choices
-                if choice.targetSceneId != scene_id
+                if choice.targetSceneId not in deleted
             ]
+        
+        project.touch()
     
     def add_choice(
         self,
@@ -81,6 +99,7 @@ class SceneService:
             targetSceneId=target_scene_id,
         )
         scene.choices.append(choice)
+        project.touch()
         return choice
     
     def update_choice(
@@ -105,6 +124,7 @@ class SceneService:
         if target_scene_id is not None:
             choice.targetSceneId = target_scene_id
         
+        project.touch()
         return choice
     
     def delete_choice(
@@ -119,6 +139,7 @@ class SceneService:
             raise ValueError(f"Scene {scene_id} not found")
         
         scene.choices = [c for c in scene.choices if c.id != choice_id]
+        project.touch()
     
     def get_all_scenes(self, project: Project) -> List[Scene]:
         """Get all scenes"""
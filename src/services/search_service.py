@@ -2,11 +2,51 @@
 Search Service - RAG for story content retrieval using Vector Database
 """
 from __future__ import annotations
+from collections import Counter
 from typing import List, Dict, Set, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import numpy as np
 from ..models.project import Project
 from ..models.character import Character
 from ..models.scene import Scene
 from ..infra.vector_db import VectorDatabase
+from .scene_index import get_scene_index
+
+
+# Async searches share this pool, so at most this many hit the embedding
+# backend at once; further calls queue instead of spawning more threads
+MAX_CONCURRENT_SEARCHES = 8
+_search_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_SEARCHES, thread_name_prefix="search"
+)
+
+
+def _lowered_characters(project: Project) -> list:
+    """(character, name, alias, description, [(trait, trait_lc)]) rows, lowercased once per revision"""
+    return project.derived("keyword_search_characters", lambda: [
+        (
+            char,
+            char.name.lower(),
+            char.alias.lower() if char.alias else "",
+            char.description.lower(),
+            [(trait, trait.lower()) for trait in char.traits],
+        )
+        for char in project.characters.values()
+    ])
+
+
+def _lowered_scenes(project: Project) -> list:
+    """(scene, title, chapter, [(tag, tag_lc)]) rows, lowercased once per revision"""
+    return project.derived("keyword_search_scenes", lambda: [
+        (
+            scene,
+            scene.title.lower(),
+            scene.chapter.lower() if scene.chapter else "",
+            [(tag, tag.lower()) for tag in scene.tags],
+        )
+        for scene in project.scenes.values()
+    ])
 
 
 class SearchService:
@@ -24,7 +64,8 @@ class SearchService:
         project: Project, 
         query: str, 
         max_chars: int = 3,
-        max_scenes: int = 3
+        max_scenes: int = 3,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Dict[str, any]:
         """
         Search for relevant characters and scenes using semantic search
@@ -34,6 +75,7 @@ class SearchService:
             query: User's question
             max_chars: Maximum number of characters to return
             max_scenes: Maximum number of scenes to return
+            query_embedding: Embedding of query computed earlier, if any
             
         Returns:
             {
@@ -42,8 +84,6 @@ class SearchService:
                 "matched_keywords": Set[str]
             }
         """
-        matched_keywords = set()
-        
         if not self.vector_db or not self.vector_db.is_available():
             # Fallback to keyword search if vector DB not available
             return self._keyword_search(project, query, max_chars, max_scenes)
@@ -51,24 +91,20 @@ class SearchService:
         # Get project identifier
         project_id = project.id
         
-        # Search using vector database
-        char_results = self.vector_db.search_characters(project_id, query, top_k=max_chars)
-        scene_results = self.vector_db.search_scenes(project_id, query, top_k=max_scenes)
-        
-        # Convert results back to model objects
-        selected_chars = []
-        for result in char_results:
-            char_id = result['id']
-            if char_id in project.characters:
-                selected_chars.append(project.characters[char_id])
-                matched_keywords.add(project.characters[char_id].name)
-        
-        selected_scenes = []
-        for result in scene_results:
-            scene_id = result['id']
-            if scene_id in project.scenes:
-                selected_scenes.append(project.scenes[scene_id])
-                matched_keywords.add(project.scenes[scene_id].title)
+        # Search using vector database (one query embedding for both indices)
+        char_results, scene_results = self.vector_db.search_all(
+            project_id, query, char_top_k=max_chars, scene_top_k=max_scenes,
+            query_embedding=query_embedding,
+        )
+        
+        # Convert results back to model objects (IDs of since-deleted
+        # entries may still be in the index)
+        characters, scenes = project.characters, project.scenes
+        selected_chars = [characters[r['id']] for r in char_results if r['id'] in characters]
+        selected_scenes = [scenes[r['id']] for r in scene_results if r['id'] in scenes]
+        
+        matched_keywords = {char.name for char in selected_chars}
+        matched_keywords.update(scene.title for scene in selected_scenes)
         
         return {
             "characters": selected_chars,
@@ -85,22 +121,25 @@ class SearchService:
     ) -> Dict[str, any]:
         """Fallback keyword-based search (original implementation)"""
         query_lower = query.lower()
+        query_words = query_lower.split()
+        char_words = [word for word in query_words if len(word) > 2]
+        scene_words = [word for word in query_words if len(word) > 3]
         matched_keywords = set()
         
         # Search characters
         relevant_chars = []
-        for char in project.characters.values():
+        for char, name_lc, alias_lc, description_lc, traits in _lowered_characters(project):
             score = 0
-            if char.name.lower() in query_lower:
+            if name_lc in query_lower:
                 score += 10
                 matched_keywords.add(char.name)
-            if char.alias and char.alias.lower() in query_lower:
+            if alias_lc and alias_lc in query_lower:
                 score += 8
                 matched_keywords.add(char.alias)
-            if any(word in char.description.lower() for word in query_lower.split() if len(word) > 2):
+            if any(word in description_lc for word in char_words):
                 score += 2
-            for trait in char.traits:
-                if trait.lower() in query_lower:
+            for trait, trait_lc in traits:
+                if trait_lc in query_lower:
                     score += 3
                     matched_keywords.add(trait)
             
@@ -110,24 +149,33 @@ class SearchService:
         relevant_chars.sort(key=lambda x: x[0], reverse=True)
         selected_chars = [char for _, char in relevant_chars[:max_chars]]
         
+        # Scenes whose text contains a query word, verified against the
+        # keyword index's lowercased text instead of re-lowering each body
+        index = get_scene_index(project)
+        body_hits = {scene.id for word in scene_words for scene in index.search(word)}
+        
+        # Selected characters appearing in each scene, via the participant index
+        scenes_by_character = project.get_scenes_by_character()
+        participation = Counter(
+            scene_id for char in selected_chars for scene_id in scenes_by_character.get(char.id, ())
+        )
+        
         # Search scenes
         relevant_scenes = []
-        for scene in project.scenes.values():
+        for scene, title_lc, chapter_lc, tags in _lowered_scenes(project):
             score = 0
-            if scene.title.lower() in query_lower:
+            if title_lc in query_lower:
                 score += 10
                 matched_keywords.add(scene.title)
-            if scene.chapter and scene.chapter.lower() in query_lower:
+            if chapter_lc and chapter_lc in query_lower:
                 score += 5
                 matched_keywords.add(scene.chapter)
-            for tag in scene.tags:
-                if tag.lower() in query_lower:
+            for tag, tag_lc in tags:
+                if tag_lc in query_lower:
                     score += 4
                     matched_keywords.add(tag)
-            for char in selected_chars:
-                if char.id in scene.participants:
-                    score += 6
-            if scene.body and any(word in scene.body.lower() for word in query_lower.split() if len(word) > 3):
+            score += 6 * participation[scene.id]
+            if scene.id in body_hits:
                 score += 1
             
             if score > 0:
@@ -142,75 +190,87 @@ class SearchService:
             "matched_keywords": matched_keywords
         }
     
-    def get_contextual_summary(self, project: Project, query: str) -> str:
+    def get_contextual_summary(self, project: Project, query: str,
+                               query_embedding: Optional[np.ndarray] = None) -> str:
         """
         Generate a contextual summary for the query (for RAG context)
         
+        Pass query_embedding to reuse an embedding of query computed earlier.
         Returns a formatted string containing relevant characters, scenes, and world facts
         """
-        results = self.search_relevant_content(project, query)
+        results = self.search_relevant_content(project, query, query_embedding=query_embedding)
         
-        context = f"Project: {project.name}\n\n"
+        parts = [f"Project: {project.name}\n\n"]
         
         # Add matched characters
         if results["characters"]:
-            context += "=== RELEVANT CHARACTERS ===\n"
+            parts.append("=== RELEVANT CHARACTERS ===\n")
             for char in results["characters"]:
-                context += f"\n**{char.name}**"
+                parts.append(f"\n**{char.name}**")
                 if char.alias:
-                    context += f" (aka {char.alias})"
-                context += f"\n- Description: {char.description}\n"
+                    parts.append(f" (aka {char.alias})")
+                parts.append(f"\n- Description: {char.description}\n")
                 if char.traits:
-                    context += f"- Traits: {', '.join(char.traits)}\n"
+                    parts.append(f"- Traits: {', '.join(char.traits)}\n")
                 if char.goals:
-                    context += f"- Goals: {', '.join(char.goals)}\n"
+                    parts.append(f"- Goals: {', '.join(char.goals)}\n")
                 if char.fears:
-                    context += f"- Fears: {', '.join(char.fears)}\n"
+                    parts.append(f"- Fears: {', '.join(char.fears)}\n")
         
         # Add matched scenes
         if results["scenes"]:
-            context += "\n=== RELEVANT SCENES ===\n"
+            parts.append("\n=== RELEVANT SCENES ===\n")
             for scene in results["scenes"]:
-                context += f"\n**{scene.title}**"
+                parts.append(f"\n**{scene.title}**")
                 if scene.chapter:
-                    context += f" (Chapter: {scene.chapter})"
-                context += "\n"
+                    parts.append(f" (Chapter: {scene.chapter})")
+                parts.append("\n")
                 
                 if scene.summary:
-                    context += f"Summary: {scene.summary}\n"
+                    parts.append(f"Summary: {scene.summary}\n")
                 elif scene.body:
                     # Use truncated body if no summary
                     preview = scene.body[:300] + "..." if len(scene.body) > 300 else scene.body
-                    context += f"Content: {preview}\n"
+                    parts.append(f"Content: {preview}\n")
                 
                 if scene.tags:
-                    context += f"Tags: {', '.join(scene.tags)}\n"
+                    parts.append(f"Tags: {', '.join(scene.tags)}\n")
         
         # Add world facts if they exist and are relevant
         if project.worldState.facts:
             # Simple keyword matching for facts (can be enhanced with vector search later)
             relevant_facts = []
-            query_lower = query.lower()
+            query_words = [word for word in query.lower().split() if len(word) > 2]
             for fact in project.worldState.facts.values():
-                if any(word in fact.content.lower() for word in query_lower.split() if len(word) > 2):
+                if any(word in fact.content.lower() for word in query_words):
                     relevant_facts.append(fact)
+                    if len(relevant_facts) == 5:
+                        break
             
             if relevant_facts:
-                context += "\n=== WORLD FACTS & LORE ===\n"
-                for fact in relevant_facts[:5]:  # Limit to top 5 facts
-                    context += f"\n- {fact.content}"
+                parts.append("\n=== WORLD FACTS & LORE ===\n")
+                for fact in relevant_facts:  # Limited to the first 5 facts above
+                    parts.append(f"\n- {fact.content}")
                     if fact.category:
-                        context += f" [{fact.category}]"
+                        parts.append(f" [{fact.category}]")
                     if fact.sourceSceneId:
-                        context += f" (from scene: {fact.sourceSceneId})"
-                    context += "\n"
+                        parts.append(f" (from scene: {fact.sourceSceneId})")
+                    parts.append("\n")
         
         # If nothing matched, provide a general summary
         if not results["characters"] and not results["scenes"] and not project.worldState.facts:
-            context += "\n=== GENERAL PROJECT INFO ===\n"
-            context += f"Total Characters: {len(project.characters)}\n"
-            context += f"Total Scenes: {len(project.scenes)}\n"
-            context += f"Total World Facts: {len(project.worldState.facts)}\n"
-            context += "\nNote: No specific matches found for your query. You may want to be more specific.\n"
+            parts.append("\n=== GENERAL PROJECT INFO ===\n")
+            parts.append(f"Total Characters: {len(project.characters)}\n")
+            parts.append(f"Total Scenes: {len(project.scenes)}\n")
+            parts.append(f"Total World Facts: {len(project.worldState.facts)}\n")
+            parts.append("\nNote: No specific matches found for your query. You may want to be more specific.\n")
         
-        return context
+        return "".join(parts)
+    
+    async def aget_contextual_summary(self, project: Project, query: str,
+                                      query_embedding: Optional[np.ndarray] = None) -> str:
+        """Async variant of get_contextual_summary (runs on the bounded search pool)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _search_executor, self.get_contextual_summary, project, query, query_embedding
+        )
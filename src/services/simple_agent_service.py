@@ -2,11 +2,121 @@
 Simple Agent Service with Tool Calling
 Uses LiteLLM's function calling for a lightweight agent implementation
 """
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from functools import lru_cache, wraps
 from typing import Dict, List, Any, Optional
 import json
-from litellm import completion
+from litellm import acompletion
 
 from ..models.project import Project
+from ..infra.async_utils import run_sync
+from .scene_index import get_scene_index
+
+
+# Characters of a tool result shown in the reasoning steps
+TOOL_RESULT_PREVIEW_CHARS = 500
+
+# Characters of a tool result sent back to the LLM; the result is re-sent in
+# the prompt of every later round, so long listings are cut here
+MAX_TOOL_RESULT_CHARS = 8000
+
+# Output budget per LLM round. Rounds can't be told apart in advance (a
+# round may call tools or answer), so one cap bounds long preambles before
+# tool calls; an answer that hits it is continued in follow-up rounds.
+MAX_ROUND_TOKENS = 1024
+# Follow-up rounds allowed for one answer cut off by MAX_ROUND_TOKENS
+MAX_ANSWER_CONTINUATIONS = 3
+# Sent after an answer cut off by MAX_ROUND_TOKENS
+_CONTINUE_PROMPT = "Continue exactly where your previous reply stopped, without repeating it."
+# Factual lookups: deterministic tool routing and answers
+AGENT_TEMPERATURE = 0.0
+
+# Tool calls of one round run side by side on this pool
+MAX_PARALLEL_TOOL_CALLS = 4
+_tool_executor = ThreadPoolExecutor(
+    max_workers=MAX_PARALLEL_TOOL_CALLS, thread_name_prefix="simple-agent-tool"
+)
+
+
+def _per_revision(method):
+    """
+    Cache an argument-free tool's output until the next project edit
+    
+    Stored in project.derived(), so any mutation that calls
+    project.touch() drops it.
+    """
+    key = f"simple_agent{method.__name__}"
+    
+    @wraps(method)
+    def wrapper(self) -> str:
+        return self.project.derived(key, lambda: method(self))
+    return wrapper
+
+
+def _merge_tool_call_deltas(calls: Dict[int, Dict], fragments) -> None:
+    """
+    Fold streamed tool-call fragments into calls (index -> OpenAI tool call)
+    
+    Providers send each call's id and name once and its arguments JSON
+    split across chunks, all keyed by the call's index.
+    """
+    for fragment in fragments:
+        call = calls.setdefault(fragment.index, {
+            "id": None,
+            "type": "function",
+            "function": {"name": "", "arguments": ""},
+        })
+        if fragment.id:
+            call["id"] = fragment.id
+        if fragment.function is not None:
+            if fragment.function.name:
+                call["function"]["name"] += fragment.function.name
+            if fragment.function.arguments:
+                call["function"]["arguments"] += fragment.function.arguments
+
+
+def _parse_tool_args(arguments: str) -> Dict:
+    """
+    Parsed tool-call arguments; {} when empty or malformed
+    
+    Most tools take no arguments, so the usual "" / "{}" skips the parser.
+    """
+    if not arguments or arguments == "{}":
+        return {}
+    try:
+        return json.loads(arguments)
+    except json.JSONDecodeError:
+        return {}
+
+
+@lru_cache(maxsize=16)
+def _system_prompt(project_name: str) -> str:
+    """System prompt for project_name, built once per name"""
+    return f"""You are a helpful story assistant for "{project_name}".
+
+Your role is to help users explore this interactive fiction story by answering questions about:
+- Characters, their traits, relationships, and goals
+- Scenes, plot points, and story structure
+- World-building facts and lore
+- Story branches and endings
+
+CRITICAL INSTRUCTIONS:
+1. When user asks a question, THINK about what information you need
+2. USE TOOLS to retrieve accurate information from the story database
+3. NEVER make up or hallucinate information
+4. After getting tool results, synthesize a clear, helpful answer
+
+Available tools:
+- get_all_characters() - List all characters
+- get_character_by_name(name) - Get character details
+- get_all_scenes() - List all scenes
+- search_scenes(keyword) - Find scenes by keyword
+- search_scenes_multi(keywords) - Find scenes matching any of several keywords
+- count_endings() - Count story endings
+- get_world_facts() - Get world lore
+
+Respond in the same language as the user's question."""
 
 
 class SimpleAgentService:
@@ -22,228 +132,251 @@ class SimpleAgentService:
     Maximum 5 rounds to prevent infinite loops
     """
     
-    def __init__(self, project: Project, model: str = "deepseek/deepseek-chat"):
-        self.project = project
-        self.model = model
-        self.max_rounds = 5
-        
-    def get_tools_schema(self) -> List[Dict]:
-        """Define available tools in OpenAI function calling format"""
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_all_characters",
-                    "description": "Get a list of all characters in the story. Use when user asks '现在整个故事中有几个角色？', 'How many characters?', '列出所有角色', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
+    # Tool definitions in OpenAI function calling format, shared by all
+    # instances and sent unchanged on every round
+    _TOOLS_SCHEMA: List[Dict] = [
+        {
+            "type": "function",
+            "function": {
+                "name": "get_all_characters",
+                "description": "Get a list of all characters in the story. Use when user asks '现在整个故事中有几个角色？', 'How many characters?', '列出所有角色', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
                 }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_character_by_name",
-                    "description": "Get detailed information about a specific character. Use when user asks about a specific character like '陈墨是谁？', 'Who is Chen Mo?', '告诉我关于林雪薇的信息', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "Character name or alias to search for"
-                            }
-                        },
-                        "required": ["name"]
-                    }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "get_character_by_name",
+                "description": "Get detailed information about a specific character. Use when user asks about a specific character like '陈墨是谁？', 'Who is Chen Mo?', '告诉我关于林雪薇的信息', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "name": {
+                            "type": "string",
+                            "description": "Character name or alias to search for"
+                        }
+                    },
+                    "required": ["name"]
                 }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_all_scenes",
-                    "description": "Get a list of all scenes in the story. Use when user asks '有哪些场景？', 'What scenes are there?', '故事有多少章节？', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "get_all_scenes",
+                "description": "Get a list of all scenes in the story. Use when user asks '有哪些场景？', 'What scenes are there?', '故事有多少章节？', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
                 }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_scenes",
-                    "description": "Search for scenes containing specific keywords. Use when user wants to find scenes about a topic like '哪些场景提到了记忆？', 'Find scenes about police', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "keyword": {
-                                "type": "string",
-                                "description": "Keyword to search for in scene titles, summaries, and content"
-                            }
-                        },
-                        "required": ["keyword"]
-                    }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "search_scenes",
+                "description": "Search for scenes containing specific keywords. Use when user wants to find scenes about a topic like '哪些场景提到了记忆？', 'Find scenes about police', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "keyword": {
+                            "type": "string",
+                            "description": "Keyword to search for in scene titles, summaries, and content"
+                        }
+                    },
+                    "required": ["keyword"]
                 }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "count_endings",
-                    "description": "Count how many endings the story has. Use when user asks '这个故事有几个结局？', 'How many endings?', '有哪些结局？', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "search_scenes_multi",
+                "description": "Find scenes mentioning any of several keywords in one call. Use instead of repeated search_scenes calls when the question names several topics, like '哪些场景提到了记忆或警局？', 'Find scenes about the rain or the rooftop', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "keywords": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Keywords to search for in scene titles, summaries, and content"
+                        }
+                    },
+                    "required": ["keywords"]
                 }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_world_facts",
-                    "description": "Get world-building facts and lore. Use when user asks about story setting, worldview, or background like '这个故事的世界观是什么？', 'What is the setting?', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "count_endings",
+                "description": "Count how many endings the story has. Use when user asks '这个故事有几个结局？', 'How many endings?', '有哪些结局？', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
                 }
             }
-        ]
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "get_world_facts",
+                "description": "Get world-building facts and lore. Use when user asks about story setting, worldview, or background like '这个故事的世界观是什么？', 'What is the setting?', etc.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                }
+            }
+        }
+    ]
+    
+    def __init__(self, project: Project, model: str = "deepseek/deepseek-chat"):
+        self.project = project
+        self.model = model
+        self.max_rounds = 5
+        # Tool name -> implementation taking the parsed arguments
+        self._tool_fns = {
+            "get_all_characters": lambda args: self._get_all_characters(),
+            "get_character_by_name": lambda args: self._get_character_by_name(args.get("name", "")),
+            "get_all_scenes": lambda args: self._get_all_scenes(),
+            "search_scenes": lambda args: self._search_scenes(args.get("keyword", "")),
+            "search_scenes_multi": lambda args: self._search_scenes_multi(args.get("keywords", [])),
+            "count_endings": lambda args: self._count_endings(),
+            "get_world_facts": lambda args: self._get_world_facts(),
+        }
+        
+    def get_tools_schema(self) -> List[Dict]:
+        """Define available tools in OpenAI function calling format"""
+        return self._TOOLS_SCHEMA
     
     def execute_tool(self, tool_name: str, arguments: Dict) -> str:
         """Execute a tool and return the result"""
+        tool_fn = self._tool_fns.get(tool_name)
+        if tool_fn is None:
+            return f"Unknown tool: {tool_name}"
         try:
-            if tool_name == "get_all_characters":
-                return self._get_all_characters()
-            elif tool_name == "get_character_by_name":
-                return self._get_character_by_name(arguments.get("name", ""))
-            elif tool_name == "get_all_scenes":
-                return self._get_all_scenes()
-            elif tool_name == "search_scenes":
-                return self._search_scenes(arguments.get("keyword", ""))
-            elif tool_name == "count_endings":
-                return self._count_endings()
-            elif tool_name == "get_world_facts":
-                return self._get_world_facts()
-            else:
-                return f"Unknown tool: {tool_name}"
+            return tool_fn(arguments)
         except Exception as e:
             return f"Error executing {tool_name}: {str(e)}"
     
     # Tool implementations
+    @_per_revision
     def _get_all_characters(self) -> str:
         chars = list(self.project.characters.values())
         if not chars:
             return "No characters found."
         
-        result = f"Total: {len(chars)} characters\n\n"
+        parts = [f"Total: {len(chars)} characters\n\n"]
         for char in chars:
-            aliases = f" (aka {', '.join(char.aliases)})" if char.aliases else ""
+            alias = f" (aka {char.alias})" if char.alias else ""
             traits = f"\nTraits: {', '.join(char.traits[:3])}" if char.traits else ""
-            result += f"• {char.name}{aliases}{traits}\n"
+            parts.append(f"• {char.name}{alias}{traits}\n")
             if char.description:
                 desc = char.description[:100] + "..." if len(char.description) > 100 else char.description
-                result += f"  {desc}\n"
-            result += "\n"
-        return result
+                parts.append(f"  {desc}\n")
+            parts.append("\n")
+        return "".join(parts)
     
     def _get_character_by_name(self, name: str) -> str:
-        name_lower = name.lower()
-        for char in self.project.characters.values():
-            if (char.name.lower() == name_lower or 
-                any(alias.lower() == name_lower for alias in char.aliases)):
-                result = f"**{char.name}**\n"
-                if char.aliases:
-                    result += f"Aliases: {', '.join(char.aliases)}\n"
-                if char.description:
-                    result += f"\n{char.description}\n"
-                if char.traits:
-                    result += f"\nTraits: {', '.join(char.traits)}\n"
-                if char.goals:
-                    result += f"\nGoals: {', '.join(char.goals)}\n"
-                if char.relationships:
-                    result += f"\nRelationships:\n"
-                    for rel in char.relationships:
-                        result += f"  • {rel.targetName}: {rel.relationType}\n"
-                return result
-        available = ', '.join(c.name for c in self.project.characters.values())
-        return f"Character '{name}' not found. Available: {available}"
+        char = self.project.find_character(name)
+        if char is None:
+            available = ', '.join(c.name for c in self.project.characters.values())
+            return f"Character '{name}' not found. Available: {available}"
+        
+        parts = [f"**{char.name}**\n"]
+        if char.alias:
+            parts.append(f"Alias: {char.alias}\n")
+        if char.description:
+            parts.append(f"\n{char.description}\n")
+        if char.traits:
+            parts.append(f"\nTraits: {', '.join(char.traits)}\n")
+        if char.goals:
+            parts.append(f"\nGoals: {', '.join(char.goals)}\n")
+        if char.relationships:
+            parts.append(f"\nRelationships:\n")
+            for rel in char.relationships:
+                parts.append(f"  • {rel.targetId}: {rel.summary}\n")
+        return "".join(parts)
     
+    @_per_revision
     def _get_all_scenes(self) -> str:
         scenes = list(self.project.scenes.values())
         if not scenes:
             return "No scenes found."
         
-        result = f"Total: {len(scenes)} scenes\n\n"
-        chapters = {}
-        for scene in scenes:
-            chapter = scene.chapter or "No Chapter"
-            if chapter not in chapters:
-                chapters[chapter] = []
-            chapters[chapter].append(scene)
-        
-        for chapter, scene_list in sorted(chapters.items()):
-            result += f"\n**{chapter}**\n"
+        parts = [f"Total: {len(scenes)} scenes\n\n"]
+        for chapter, scene_list in self.project.get_scenes_by_chapter().items():
+            parts.append(f"\n**{chapter}**\n")
             for scene in scene_list:
-                result += f"{scene.id}. {scene.title}\n"
+                parts.append(f"{scene.id}. {scene.title}\n")
                 if scene.summary:
                     summary = scene.summary[:100] + "..." if len(scene.summary) > 100 else scene.summary
-                    result += f"   {summary}\n"
-        return result
+                    parts.append(f"   {summary}\n")
+        return "".join(parts)
     
     def _search_scenes(self, keyword: str) -> str:
-        keyword_lower = keyword.lower()
-        matches = []
-        
-        for scene in self.project.scenes.values():
-            if (keyword_lower in scene.title.lower() or
-                (scene.summary and keyword_lower in scene.summary.lower()) or
-                (scene.body and keyword_lower in scene.body.lower()) or
-                any(keyword_lower in tag.lower() for tag in scene.tags)):
-                matches.append(scene)
+        matches = get_scene_index(self.project).search(keyword.lower())
         
         if not matches:
             return f"No scenes found containing '{keyword}'."
         
-        result = f"Found {len(matches)} scene(s) with '{keyword}':\n\n"
+        parts = [f"Found {len(matches)} scene(s) with '{keyword}':\n\n"]
         for scene in matches:
-            result += f"• {scene.id}. {scene.title}\n"
+            parts.append(f"• {scene.id}. {scene.title}\n")
             if scene.chapter:
-                result += f"  Chapter: {scene.chapter}\n"
-        return result
+                parts.append(f"  Chapter: {scene.chapter}\n")
+        return "".join(parts)
     
+    def _search_scenes_multi(self, keywords: List[str]) -> str:
+        matches = get_scene_index(self.project).search_any([k.lower() for k in keywords])
+        label = ", ".join(f"'{k}'" for k in keywords)
+        
+        if not matches:
+            return f"No scenes found containing any of {label}."
+        
+        parts = [f"Found {len(matches)} scene(s) with any of {label}:\n\n"]
+        for scene in matches:
+            parts.append(f"• {scene.id}. {scene.title}\n")
+            if scene.chapter:
+                parts.append(f"  Chapter: {scene.chapter}\n")
+        return "".join(parts)
+    
+    @_per_revision
     def _count_endings(self) -> str:
-        endings = [s for s in self.project.scenes.values()
-                   if not s.choices or all(not c.nextSceneId for c in s.choices)]
+        endings = [self.project.scenes[scene_id] for scene_id in self.project.get_ending_ids()]
         
         if not endings:
             return "No clear endings found."
         
-        result = f"Found {len(endings)} ending(s):\n"
+        parts = [f"Found {len(endings)} ending(s):\n"]
         for scene in endings:
-            result += f"• {scene.id}. {scene.title}\n"
-        return result
+            parts.append(f"• {scene.id}. {scene.title}\n")
+        return "".join(parts)
     
+    @_per_revision
     def _get_world_facts(self) -> str:
-        # Check if worldFacts exists in WorldState
-        facts = getattr(self.project.worldState, 'facts', [])
+        facts = self.project.worldState.facts
         if not facts:
             return "No world facts have been extracted yet."
         
-        result = f"World Facts ({len(facts)} total):\n\n"
-        for fact in facts:
-            content = fact.content if hasattr(fact, 'content') else str(fact)
-            result += f"• {content}\n"
-        return result
+        parts = [f"World Facts ({len(facts)} total):\n\n"]
+        parts.extend(f"• {fact.content}\n" for fact in facts.values())
+        return "".join(parts)
     
     def chat(self, user_message: str, history: Optional[List[Dict]] = None) -> Dict:
         """
         Chat with the agent
         
+        Synchronous wrapper around achat(); from async code, await achat()
+        instead.
+        
         Args:
             user_message: User's question
             history: Previous chat history in OpenAI format
@@ -255,87 +388,124 @@ class SimpleAgentService:
                 "total_rounds": 3
             }
         """
+        return run_sync(self.achat(user_message, history))
+    
+    async def achat(self, user_message: str, history: Optional[List[Dict]] = None) -> Dict:
+        """Async variant of chat(): LLM calls don't block a thread"""
+        async for event in self.achat_stream(user_message, history):
+            if event["type"] == "final":
+                return {key: value for key, value in event.items() if key != "type"}
+    
+    async def achat_stream(self, user_message: str, history: Optional[List[Dict]] = None):
+        """
+        Streaming variant of achat()
+        
+        Async generator yielding, as they happen:
+        - {"type": "token", "content": delta} for each token of the replies
+        - the "thinking" / "tool_call" / "tool_result" step dicts of chat()'s
+          "steps"
+        then one {"type": "final", "response", "steps", "total_rounds"} event
+        with the same fields chat() returns.
+        """
         messages = history or []
         messages.append({"role": "user", "content": user_message})
         
         steps = []
         round_count = 0
+        # Parts of an answer split across rounds by MAX_ROUND_TOKENS
+        answer_parts = []
         
-        # System prompt
-        system_prompt = f"""You are a helpful story assistant for "{self.project.name}".
-
-Your role is to help users explore this interactive fiction story by answering questions about:
-- Characters, their traits, relationships, and goals
-- Scenes, plot points, and story structure
-- World-building facts and lore
-- Story branches and endings
-
-CRITICAL INSTRUCTIONS:
-1. When user asks a question, THINK about what information you need
-2. USE TOOLS to retrieve accurate information from the story database
-3. NEVER make up or hallucinate information
-4. After getting tool results, synthesize a clear, helpful answer
-
-Available tools:
-- get_all_characters() - List all characters
-- get_character_by_name(name) - Get character details
-- get_all_scenes() - List all scenes
-- search_scenes(keyword) - Find scenes by keyword
-- count_endings() - Count story endings
-- get_world_facts() - Get world lore
-
-Respond in the same language as the user's question."""
-
-        full_messages = [{"role": "system", "content": system_prompt}] + messages
+        full_messages = [{"role": "system", "content": _system_prompt(self.project.name)}, *messages]
         
         # Agent loop
-        while round_count < self.max_rounds:
+        # Continuation rounds don't count against max_rounds
+        while round_count < self.max_rounds + len(answer_parts):
             round_count += 1
             
-            # Call LLM with tools
-            response = completion(
+            # Call LLM with tools, streaming the reply
+            response = await acompletion(
                 model=self.model,
                 messages=full_messages,
                 tools=self.get_tools_schema(),
                 tool_choice="auto",
+                temperature=AGENT_TEMPERATURE,
+                max_tokens=MAX_ROUND_TOKENS,
+                stream=True,
             )
             
-            assistant_message = response.choices[0].message
+            content_parts = []
+            calls: Dict[int, Dict] = {}
+            finish_reason = None
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield {"type": "token", "content": delta.content}
+                _merge_tool_call_deltas(calls, getattr(delta, "tool_calls", None) or [])
+            
+            content = "".join(content_parts)
+            tool_calls = [calls[index] for index in sorted(calls)]
             
             # Check if LLM wants to use tools
-            if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
+            if tool_calls:
                 # LLM decided to call tools
-                steps.append({
+                step = {
                     "type": "thinking",
                     "content": f"🤔 Thinking... (Round {round_count})"
-                })
+                }
+                steps.append(step)
+                yield step
                 
-                tool_results = []
-                for tool_call in assistant_message.tool_calls:
-                    tool_name = tool_call.function.name
-                    try:
-                        tool_args = json.loads(tool_call.function.arguments) if isinstance(tool_call.function.arguments, str) else tool_call.function.arguments
-                    except:
-                        tool_args = {}
+                # Parse all arguments up front, so malformed JSON is handled here
+                # rather than on a worker thread
+                tool_names, tool_args_list = [], []
+                for tool_call in tool_calls:
+                    tool_name = tool_call["function"]["name"]
+                    tool_args = _parse_tool_args(tool_call["function"]["arguments"])
+                    tool_names.append(tool_name)
+                    tool_args_list.append(tool_args)
                     
-                    steps.append({
+                    step = {
                         "type": "tool_call",
                         "tool": tool_name,
                         "args": tool_args
-                    })
-                    
-                    # Execute tool
-                    result = self.execute_tool(tool_name, tool_args)
-                    
-                    steps.append({
+                    }
+                    steps.append(step)
+                    yield step
+                
+                # Execute tools concurrently; they only read the project.
+                # gather() hands results back in call order.
+                if len(tool_calls) == 1:
+                    results = [self.execute_tool(tool_names[0], tool_args_list[0])]
+                else:
+                    loop = asyncio.get_running_loop()
+                    results = await asyncio.gather(*(
+                        loop.run_in_executor(_tool_executor, self.execute_tool, name, args)
+                        for name, args in zip(tool_names, tool_args_list)
+                    ))
+                
+                tool_results = []
+                for tool_call, tool_name, result in zip(tool_calls, tool_names, results):
+                    step = {
                         "type": "tool_result",
                         "tool": tool_name,
-                        "content": result[:500] + "..." if len(result) > 500 else result
-                    })
+                        "content": (
+                            result if len(result) <= TOOL_RESULT_PREVIEW_CHARS
+                            else f"{result[:TOOL_RESULT_PREVIEW_CHARS]}..."
+                        )
+                    }
+                    steps.append(step)
+                    yield step
                     
+                    if len(result) > MAX_TOOL_RESULT_CHARS:
+                        omitted = len(result) - MAX_TOOL_RESULT_CHARS
+                        result = f"{result[:MAX_TOOL_RESULT_CHARS]}\n... [truncated, {omitted} more characters]"
                     tool_results.append({
                         "role": "tool",
-                        "tool_call_id": tool_call.id,
+                        "tool_call_id": tool_call["id"],
                         "name": tool_name,
                         "content": result
                     })
@@ -343,40 +513,41 @@ Respond in the same language as the user's question."""
                 # Add assistant's tool calls and tool results to messages
                 full_messages.append({
                     "role": "assistant",
-                    "content": assistant_message.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        for tc in assistant_message.tool_calls
-                    ]
+                    "content": content,
+                    "tool_calls": tool_calls
                 })
                 full_messages.extend(tool_results)
                 
                 # Continue loop to let LLM synthesize answer
                 
+            elif finish_reason == "length" and len(answer_parts) < MAX_ANSWER_CONTINUATIONS:
+                # Answer cut off by MAX_ROUND_TOKENS: ask for the rest
+                answer_parts.append(content)
+                full_messages.append({"role": "assistant", "content": content})
+                full_messages.append({"role": "user", "content": _CONTINUE_PROMPT})
+                
             else:
                 # LLM provided final answer
-                final_answer = assistant_message.content
-                
+                answer_parts.append(content)
+                content = "".join(answer_parts)
+                if finish_reason == "length":
+                    content += "\n\n[Answer truncated]"
                 steps.append({
                     "type": "final_answer",
-                    "content": final_answer
+                    "content": content
                 })
                 
-                return {
-                    "response": final_answer,
+                yield {
+                    "type": "final",
+                    "response": content,
                     "steps": steps,
                     "total_rounds": round_count
                 }
+                return
         
         # Max rounds reached
-        return {
+        yield {
+            "type": "final",
             "response": "抱歉，我无法在限定步骤内完成回答。请尝试更具体的问题。 / Sorry, I couldn't complete the answer within the limit. Please try a more specific question.",
             "steps": steps,
             "total_rounds": round_count
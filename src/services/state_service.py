@@ -2,12 +2,55 @@
 State Service - Compute dynamic character/world state by replaying effects along story threads
 """
 from __future__ import annotations
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Any, Optional
-from copy import deepcopy
+import threading
 
 from ..models.project import Project
 from ..models.character import CharacterState
-from ..models.world import Effect, WorldState
+from ..models.world import Effect, WorldState, StoryThread
+
+
+# compute_state results kept per project revision
+STATE_CACHE_SIZE = 256
+
+# Effect path -> CharacterState field replaced by "set" effects
+_CHARACTER_FIELD_PATHS = {
+    "mood": "mood", "state.mood": "mood",
+    "status": "status", "state.status": "status",
+    "location": "location", "state.location": "location",
+}
+
+# Effect path -> CharacterState list changed by "add" / "remove" effects
+_CHARACTER_LIST_PATHS = {
+    "traits": "active_traits",
+    "goals": "active_goals",
+    "fears": "active_fears",
+}
+
+
+def _copy_relations(value: Any) -> Any:
+    """Copy the nested dicts of relationship states (leaf values are shared)"""
+    if isinstance(value, dict):
+        return {key: _copy_relations(item) for key, item in value.items()}
+    return value
+
+
+def _copy_state(
+    state: Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]
+) -> Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]:
+    """
+    Independent copy of a compute_state() result
+    
+    Copies every container an effect can modify, which is far cheaper than
+    deepcopy's generic traversal of the pydantic models.
+    """
+    world_state, character_states, relationship_states = state
+    return (
+        world_state.fast_clone(),
+        {char_id: char_state.fast_clone() for char_id, char_state in character_states.items()},
+        _copy_relations(relationship_states),
+    )
 
 
 class StateService:
@@ -25,15 +68,25 @@ class StateService:
         self,
         project: Project,
         thread_id: str,
-        step_index: int
+        step_index: int,
+        copy: bool = True
     ) -> Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]:
         """
         Compute the effective state at a specific step in a story thread
         
+        Replays are cached per project revision (LRU, STATE_CACHE_SIZE
+        entries), so scrubbing back and forth along a thread or diffing two
+        steps only replays each step once. On a miss, replay resumes from
+        the closest cached earlier step of the same thread instead of step
+        0, so walking a timeline forward costs one step per call.
+        
         Args:
             project: Project object
             thread_id: Story thread ID to follow
             step_index: Which step to compute state for (0-based index)
+            copy: Return a copy the caller may mutate. Pass False only
+                when the result is read, never modified; it is then the
+                cached object itself.
             
         Returns:
             (world_state, character_states, relationship_states)
@@ -45,17 +98,59 @@ class StateService:
         if thread_id not in project.threads:
             raise ValueError(f"Thread {thread_id} not found in project")
         
-        thread = project.threads[thread_id]
+        # State tools run on worker threads, so the LRU is shared between
+        # threads; the replay itself runs outside the lock
+        lock, cache = project.derived("replayed_states", lambda: (threading.Lock(), OrderedDict()))
+        key = (thread_id, step_index)
+        with lock:
+            state = cache.get(key)
+            if state is not None:
+                cache.move_to_end(key)
+            else:
+                # Closest cached checkpoint at or before step_index
+                start = max(
+                    (step for cached_thread, step in cache
+                     if cached_thread == thread_id and step < step_index),
+                    default=None,
+                )
+                checkpoint = (start, cache[(thread_id, start)]) if start is not None else None
         
-        # Initialize states from base data
-        world_state = deepcopy(project.worldState)
-        character_states = self._init_character_states(project)
-        relationship_states = {}
+        if state is None:
+            state = self._replay(project, project.threads[thread_id], step_index, checkpoint)
+            with lock:
+                cache[key] = state
+                if len(cache) > STATE_CACHE_SIZE:
+                    cache.popitem(last=False)
+        
+        return _copy_state(state) if copy else state
+    
+    def _replay(
+        self,
+        project: Project,
+        thread: StoryThread,
+        step_index: int,
+        checkpoint: Optional[Tuple[int, Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]]] = None
+    ) -> Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]:
+        """
+        Replay thread's effects up to step_index
+        
+        Starts from checkpoint, a (step, state) pair for an earlier step whose
+        state is copied, not modified; without one, from the base data.
+        """
+        if checkpoint is None:
+            # Initialize states from base data
+            first_step = 0
+            world_state = project.worldState.fast_clone()
+            character_states = self._init_character_states(project)
+            relationship_states = {}
+        else:
+            checkpoint_step, state = checkpoint
+            first_step = checkpoint_step + 1
+            world_state, character_states, relationship_states = _copy_state(state)
         
         # Replay effects up to step_index
-        for i, step in enumerate(thread.steps):
-            if i > step_index:
-                break
+        for i in range(first_step, min(step_index + 1, len(thread.steps))):
+            step = thread.steps[i]
             
             scene_id = step.sceneId
             if scene_id not in project.scenes:
@@ -121,33 +216,26 @@ class StateService:
             return
         
         char_state = character_states[char_id]
-        path_parts = effect.path.split('.')
         
         # Simple path resolution for common cases
-        if effect.path in ["mood", "state.mood"]:
-            char_state.mood = effect.value if effect.op == "set" else char_state.mood
-        elif effect.path in ["status", "state.status"]:
-            char_state.status = effect.value if effect.op == "set" else char_state.status
-        elif effect.path in ["location", "state.location"]:
-            char_state.location = effect.value if effect.op == "set" else char_state.location
-        elif effect.path == "traits":
-            if effect.op == "add" and effect.value not in char_state.active_traits:
-                char_state.active_traits.append(effect.value)
-            elif effect.op == "remove" and effect.value in char_state.active_traits:
-                char_state.active_traits.remove(effect.value)
-        elif effect.path == "goals":
-            if effect.op == "add" and effect.value not in char_state.active_goals:
-                char_state.active_goals.append(effect.value)
-            elif effect.op == "remove" and effect.value in char_state.active_goals:
-                char_state.active_goals.remove(effect.value)
-        elif effect.path == "fears":
-            if effect.op == "add" and effect.value not in char_state.active_fears:
-                char_state.active_fears.append(effect.value)
-            elif effect.op == "remove" and effect.value in char_state.active_fears:
-                char_state.active_fears.remove(effect.value)
-        elif path_parts[0] == "vars":
+        field = _CHARACTER_FIELD_PATHS.get(effect.path)
+        if field is not None:
+            if effect.op == "set":
+                setattr(char_state, field, effect.value)
+            return
+        
+        field = _CHARACTER_LIST_PATHS.get(effect.path)
+        if field is not None:
+            values = getattr(char_state, field)
+            if effect.op == "add" and effect.value not in values:
+                values.append(effect.value)
+            elif effect.op == "remove" and effect.value in values:
+                values.remove(effect.value)
+            return
+        
+        head, _, var_name = effect.path.partition('.')
+        if head == "vars":
             # Custom variables like vars.trust_level
-            var_name = '.'.join(path_parts[1:])
             if effect.op == "set":
                 char_state.vars[var_name] = effect.value
             elif effect.op == "add" and isinstance(effect.value, (int, float)):
@@ -220,9 +308,24 @@ class StateService:
                 "world": {var_name: (old_val, new_val)}
             }
         """
-        # Get states at both steps
-        world_from, chars_from, rels_from = self.compute_state(project, thread_id, from_step)
-        world_to, chars_to, rels_to = self.compute_state(project, thread_id, to_step)
+        # Get states at both steps (only read, so no copies needed)
+        return self.diff_states(
+            self.compute_state(project, thread_id, from_step, copy=False),
+            self.compute_state(project, thread_id, to_step, copy=False),
+        )
+    
+    def diff_states(
+        self,
+        state_from: Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]],
+        state_to: Tuple[WorldState, Dict[str, CharacterState], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Difference between two compute_state() results (same format as diff_state)
+        
+        Lets callers that already hold computed states skip the replays.
+        """
+        world_from, chars_from, rels_from = state_from
+        world_to, chars_to, rels_to = state_to
         
         diff = {
             "characters": {},
@@ -231,19 +334,26 @@ class StateService:
         }
         
         # Compare character states
-        for char_id in set(chars_from.keys()) | set(chars_to.keys()):
+        for char_id in chars_from.keys() | chars_to.keys():
             char_diff = {}
             state_from = chars_from.get(char_id)
             state_to = chars_to.get(char_id)
             
-            if state_from and state_to:
+            # Most characters are untouched between two steps: one model
+            # comparison settles them without checking field by field
+            if state_from and state_to and state_from != state_to:
                 # Check each field
                 if state_from.mood != state_to.mood:
                     char_diff["mood"] = (state_from.mood, state_to.mood)
                 if state_from.status != state_to.status:
                     char_diff["status"] = (state_from.status, state_to.status)
-                if set(state_from.active_traits) != set(state_to.active_traits):
-                    char_diff["traits"] = (state_from.active_traits, state_to.active_traits)
+                # Traits are kept free of duplicates, so equal lists or a
+                # length mismatch decide without building sets
+                traits_from, traits_to = state_from.active_traits, state_to.active_traits
+                if traits_from != traits_to and (
+                    len(traits_from) != len(traits_to) or set(traits_from) != set(traits_to)
+                ):
+                    char_diff["traits"] = (traits_from, traits_to)
                 if state_from.vars != state_to.vars:
                     char_diff["vars"] = (state_from.vars, state_to.vars)
             
@@ -251,12 +361,12 @@ class StateService:
                 diff["characters"][char_id] = char_diff
         
         # Compare relationships
-        for rel_key in set(rels_from.keys()) | set(rels_to.keys()):
+        for rel_key in rels_from.keys() | rels_to.keys():
             if rels_from.get(rel_key) != rels_to.get(rel_key):
                 diff["relationships"][rel_key] = (rels_from.get(rel_key), rels_to.get(rel_key))
         
         # Compare world vars
-        for var_name in set(world_from.vars.keys()) | set(world_to.vars.keys()):
+        for var_name in world_from.vars.keys() | world_to.vars.keys():
             if world_from.vars.get(var_name) != world_to.vars.get(var_name):
                 diff["world"][var_name] = (world_from.vars.get(var_name), world_to.vars.get(var_name))
         
@@ -270,5 +380,6 @@ class StateService:
         character_id: str
     ) -> Optional[CharacterState]:
         """Convenience method to get a single character's state at a specific step"""
-        _, char_states, _ = self.compute_state(project, thread_id, step_index)
-        return char_states.get(character_id)
+        _, char_states, _ = self.compute_state(project, thread_id, step_index, copy=False)
+        char_state = char_states.get(character_id)
+        return char_state.fast_clone() if char_state else None
@@ -3,6 +3,9 @@ Vector Index Service - Manages vector database indexing for projects
 """
 from __future__ import annotations
 from typing import TYPE_CHECKING
+import asyncio
+
+from ..infra.async_utils import run_sync
 
 if TYPE_CHECKING:
     from ..models.project import Project
@@ -15,59 +18,66 @@ class VectorIndexService:
     @staticmethod
     def index_project(project: 'Project', vector_db: 'VectorDatabase'):
         """Index all characters and scenes in a project"""
+        run_sync(VectorIndexService.aindex_project(project, vector_db))
+    
+    @staticmethod
+    async def aindex_project(project: 'Project', vector_db: 'VectorDatabase'):
+        """
+        Async variant of index_project
+        
+        Characters and scenes live in separate FAISS indices, so both
+        collections are embedded and written concurrently on worker threads,
+        and each is reported as soon as it finishes.
+        """
         if not vector_db.is_available():
             print("Vector database not available, skipping indexing")
             return
             
         print(f"Indexing project: {project.name}")
+        print(f"Found {len(project.characters)} characters and {len(project.scenes)} scenes to index")
         
-        try:
-            # Index all characters
-            char_count = len(project.characters)
-            print(f"Found {char_count} characters to index")
-            for idx, (char_id, char) in enumerate(project.characters.items(), 1):
-                try:
-                    print(f"  [{idx}/{char_count}] Indexing character: {char.name}")
-                    char_data = {
-                        "name": char.name,
-                        "alias": char.alias,
-                        "description": char.description,
-                        "traits": char.traits,
-                        "goals": char.goals,
-                        "fears": char.fears
-                    }
-                    vector_db.index_character(project.id, char_id, char_data)
-                    print(f"  ✓ Character {char.name} indexed")
-                except Exception as e:
-                    print(f"  ✗ Warning: Failed to index character {char_id}: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Index all scenes
-            scene_count = len(project.scenes)
-            print(f"Found {scene_count} scenes to index")
-            for idx, (scene_id, scene) in enumerate(project.scenes.items(), 1):
-                try:
-                    print(f"  [{idx}/{scene_count}] Indexing scene: {scene.title}")
-                    scene_data = {
-                        "title": scene.title,
-                        "chapter": scene.chapter,
-                        "summary": scene.summary,
-                        "body": scene.body,
-                        "tags": scene.tags
-                    }
-                    vector_db.index_scene(project.id, scene_id, scene_data)
-                    print(f"  ✓ Scene {scene.title} indexed")
-                except Exception as e:
-                    print(f"  ✗ Warning: Failed to index scene {scene_id}: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            print(f"✓ Indexed {len(project.characters)} characters and {len(project.scenes)} scenes")
-        except Exception as e:
-            print(f"ERROR: Failed to index project: {e}")
-            import traceback
-            traceback.print_exc()
+        async def index_collection(collection, count, index_fn):
+            try:
+                await asyncio.to_thread(index_fn, project, vector_db)
+            except Exception as e:
+                return f"  ✗ Warning: Failed to index {collection}: {e}"
+            return f"  ✓ Indexed {count} {collection}"
+        
+        # Report each collection as soon as it lands instead of waiting for both
+        for done in asyncio.as_completed([
+            index_collection("characters", len(project.characters), VectorIndexService._index_characters),
+            index_collection("scenes", len(project.scenes), VectorIndexService._index_scenes),
+        ]):
+            print(await done)
+        
+        print(f"✓ Finished indexing project: {project.name}")
+    
+    @staticmethod
+    def _index_characters(project: 'Project', vector_db: 'VectorDatabase'):
+        vector_db.index_characters(project.id, {
+            char_id: {
+                "name": char.name,
+                "alias": char.alias,
+                "description": char.description,
+                "traits": char.traits,
+                "goals": char.goals,
+                "fears": char.fears
+            }
+            for char_id, char in project.characters.items()
+        })
+    
+    @staticmethod
+    def _index_scenes(project: 'Project', vector_db: 'VectorDatabase'):
+        vector_db.index_scenes(project.id, {
+            scene_id: {
+                "title": scene.title,
+                "chapter": scene.chapter,
+                "summary": scene.summary,
+                "body": scene.body,
+                "tags": scene.tags
+            }
+            for scene_id, scene in project.scenes.items()
+        })
     
     @staticmethod
     def index_character(project_id: str, char_id: str, char_data: dict, vector_db: 'VectorDatabase'):
@@ -2,6 +2,7 @@
 Base Tool Class for Agent
 """
 from abc import ABC, abstractmethod
+from functools import cached_property
 from typing import Dict, Any, List
 
 
@@ -54,7 +55,15 @@ class BaseTool(ABC):
         pass
     
     def to_function_schema(self) -> Dict[str, Any]:
-        """Convert tool to OpenAI function calling schema"""
+        """
+        Convert tool to OpenAI function calling schema
+        
+        Built once per tool instance; callers must not mutate the result.
+        """
+        return self._function_schema
+    
+    @cached_property
+    def _function_schema(self) -> Dict[str, Any]:
         return {
             "type": "function",
             "function": {
@@ -2,9 +2,11 @@
 LangChain Tools for Story Agent
 Refactored to use @tool decorator for LangGraph compatibility
 """
+from collections import defaultdict
 from typing import List, Optional
 from langchain.tools import tool
 from ..models.project import Project
+from ..services.scene_index import get_scene_index
 
 
 # Tool functions with @tool decorator
@@ -20,17 +22,17 @@ def get_all_characters(project: Project) -> str:
     if not project.characters:
         return "No characters found in the story."
     
-    result = f"Total characters: {len(project.characters)}\n\n"
-    for char in project.characters:
-        aliases = f" (aka {', '.join(char.aliases)})" if char.aliases else ""
+    parts = [f"Total characters: {len(project.characters)}\n\n"]
+    for char in project.characters.values():
+        alias = f" (aka {char.alias})" if char.alias else ""
         traits = f"\nTraits: {', '.join(char.traits[:3])}" if char.traits else ""
-        result += f"• {char.name}{aliases}{traits}\n"
+        parts.append(f"• {char.name}{alias}{traits}\n")
         if char.description:
             desc = char.description[:100] + "..." if len(char.description) > 100 else char.description
-            result += f"  Description: {desc}\n"
-        result += "\n"
+            parts.append(f"  Description: {desc}\n")
+        parts.append("\n")
     
-    return result
+    return "".join(parts)
 
 
 @tool
@@ -45,29 +47,26 @@ def get_character_by_name(name: str, project: Project) -> str:
     - "告诉我关于林雪薇的信息" / "Tell me about Lin Xuewei"
     - "神秘女人有什么特征？" / "What are the mysterious woman's traits?"
     """
-    name_lower = name.lower()
-    
-    for char in project.characters:
-        if (char.name.lower() == name_lower or 
-            (char.alias and char.alias.lower() == name_lower)):
-            
-            result = f"Character: {char.name}\n"
-            if char.alias:
-                result += f"Alias: {char.alias}\n"
-            if char.description:
-                result += f"\nDescription:\n{char.description}\n"
-            if char.traits:
-                result += f"\nTraits: {', '.join(char.traits)}\n"
-            if char.goals:
-                result += f"\nGoals: {', '.join(char.goals)}\n"
-            if char.relationships:
-                result += f"\nRelationships:\n"
-                for rel in char.relationships:
-                    result += f"  • {rel.targetName}: {rel.relationType}\n"
-            
-            return result
-    
-    return f"Character '{name}' not found. Available characters: {', '.join(c.name for c in project.characters)}"
+    char = project.find_character(name)
+    if char is None:
+        available = ', '.join(c.name for c in project.characters.values())
+        return f"Character '{name}' not found. Available characters: {available}"
+    
+    parts = [f"Character: {char.name}\n"]
+    if char.alias:
+        parts.append(f"Alias: {char.alias}\n")
+    if char.description:
+        parts.append(f"\nDescription:\n{char.description}\n")
+    if char.traits:
+        parts.append(f"\nTraits: {', '.join(char.traits)}\n")
+    if char.goals:
+        parts.append(f"\nGoals: {', '.join(char.goals)}\n")
+    if char.relationships:
+        parts.append(f"\nRelationships:\n")
+        for rel in char.relationships:
+            parts.append(f"  • {rel.targetId}: {rel.summary}\n")
+    
+    return "".join(parts)
 
 
 @tool
@@ -82,27 +81,19 @@ def get_all_scenes(project: Project) -> str:
     if not project.scenes:
         return "No scenes found in the story."
     
-    result = f"Total scenes: {len(project.scenes)}\n\n"
-    
-    # Group by chapter
-    chapters = {}
-    for scene in project.scenes.values():
-        chapter = scene.chapter or "No Chapter"
-        if chapter not in chapters:
-            chapters[chapter] = []
-        chapters[chapter].append(scene)
+    parts = [f"Total scenes: {len(project.scenes)}\n\n"]
     
-    for chapter, scenes in sorted(chapters.items()):
-        result += f"\n=== {chapter} ===\n"
+    for chapter, scenes in project.get_scenes_by_chapter().items():
+        parts.append(f"\n=== {chapter} ===\n")
         for scene in scenes:
-            result += f"\n{scene.id}. {scene.title}\n"
+            parts.append(f"\n{scene.id}. {scene.title}\n")
             if scene.summary:
                 summary = scene.summary[:150] + "..." if len(scene.summary) > 150 else scene.summary
-                result += f"   Summary: {summary}\n"
+                parts.append(f"   Summary: {summary}\n")
             if scene.tags:
-                result += f"   Tags: {', '.join(scene.tags)}\n"
+                parts.append(f"   Tags: {', '.join(scene.tags)}\n")
     
-    return result
+    return "".join(parts)
 
 
 @tool
@@ -114,27 +105,27 @@ def get_scene_by_id(scene_id: str, project: Project) -> str:
         
     Use this tool when you need full scene details after finding it in the scene list.
     """
-    for scene in project.scenes.values():
-        if scene.id == scene_id:
-            result = f"Scene: {scene.title}\n"
-            result += f"ID: {scene.id}\n"
-            if scene.chapter:
-                result += f"Chapter: {scene.chapter}\n"
-            if scene.summary:
-                result += f"\nSummary:\n{scene.summary}\n"
-            if scene.body:
-                body = scene.body[:500] + "..." if len(scene.body) > 500 else scene.body
-                result += f"\nContent:\n{body}\n"
-            if scene.choices:
-                result += f"\nChoices ({len(scene.choices)}):\n"
-                for choice in scene.choices:
-                    result += f"  → {choice.text} (leads to: {choice.nextSceneId or 'None'})\n"
-            if scene.tags:
-                result += f"\nTags: {', '.join(scene.tags)}\n"
-            
-            return result
-    
-    return f"Scene with ID '{scene_id}' not found."
+    scene = project.scenes.get(scene_id)
+    if scene is None:
+        return f"Scene with ID '{scene_id}' not found."
+    
+    parts = [f"Scene: {scene.title}\n"]
+    parts.append(f"ID: {scene.id}\n")
+    if scene.chapter:
+        parts.append(f"Chapter: {scene.chapter}\n")
+    if scene.summary:
+        parts.append(f"\nSummary:\n{scene.summary}\n")
+    if scene.body:
+        body = scene.body[:500] + "..." if len(scene.body) > 500 else scene.body
+        parts.append(f"\nContent:\n{body}\n")
+    if scene.choices:
+        parts.append(f"\nChoices ({len(scene.choices)}):\n")
+        for choice in scene.choices:
+            parts.append(f"  → {choice.text} (leads to: {choice.targetSceneId or 'None'})\n")
+    if scene.tags:
+        parts.append(f"\nTags: {', '.join(scene.tags)}\n")
+    
+    return "".join(parts)
 
 
 @tool
@@ -148,60 +139,48 @@ def search_scenes(keyword: str, project: Project) -> str:
     - "哪些场景提到了记忆？" / "Which scenes mention memory?"
     - "找到关于警局的场景" / "Find scenes about the police station"
     """
-    keyword_lower = keyword.lower()
-    matching_scenes = []
-    
-    for scene in project.scenes.values():
-        if (keyword_lower in scene.title.lower() or
-            (scene.summary and keyword_lower in scene.summary.lower()) or
-            (scene.body and keyword_lower in scene.body.lower()) or
-            any(keyword_lower in tag.lower() for tag in scene.tags)):
-            matching_scenes.append(scene)
+    matching_scenes = get_scene_index(project).search(keyword.lower())
     
     if not matching_scenes:
         return f"No scenes found containing keyword '{keyword}'."
     
-    result = f"Found {len(matching_scenes)} scene(s) containing '{keyword}':\n\n"
+    parts = [f"Found {len(matching_scenes)} scene(s) containing '{keyword}':\n\n"]
     for scene in matching_scenes:
-        result += f"• {scene.id}. {scene.title}\n"
+        parts.append(f"• {scene.id}. {scene.title}\n")
         if scene.chapter:
-            result += f"  Chapter: {scene.chapter}\n"
+            parts.append(f"  Chapter: {scene.chapter}\n")
         if scene.summary:
             summary = scene.summary[:100] + "..." if len(scene.summary) > 100 else scene.summary
-            result += f"  Summary: {summary}\n"
-        result += "\n"
+            parts.append(f"  Summary: {summary}\n")
+        parts.append("\n")
     
-    return result
+    return "".join(parts)
 
 
 @tool
 def count_endings(project: Project) -> str:
-    """Count how many ending scenes exist in the story (scenes with no choices or outgoing connections).
+    """Count how many ending scenes exist in the story (scenes marked as endings, or with no outgoing connections).
     
     Use this tool when the user asks:
     - "这个故事有几个结局？" / "How many endings does the story have?"
     - "有哪些结局？" / "What are the endings?"
     """
-    endings = []
-    
-    for scene in project.scenes.values():
-        # A scene is an ending if it has no choices or all choices lead nowhere
-        if not scene.choices or all(not choice.nextSceneId for choice in scene.choices):
-            endings.append(scene)
+    # Endings: scenes marked isEnding, or whose choices all lead nowhere
+    endings = [project.scenes[scene_id] for scene_id in project.get_ending_ids()]
     
     if not endings:
-        return "No clear endings found in the story. All scenes have outgoing choices."
+        return "No clear endings found in the story. All scenes have outgoing choices and none is marked as an ending."
     
-    result = f"Found {len(endings)} ending(s):\n\n"
+    parts = [f"Found {len(endings)} ending(s):\n\n"]
     for scene in endings:
-        result += f"• {scene.id}. {scene.title}\n"
+        parts.append(f"• {scene.id}. {scene.title}\n")
         if scene.chapter:
-            result += f"  Chapter: {scene.chapter}\n"
-        if scene.tags and any('ending' in tag.lower() or '结局' in tag.lower() for tag in scene.tags):
-            result += f"  (Tagged as ending)\n"
-        result += "\n"
+            parts.append(f"  Chapter: {scene.chapter}\n")
+        if any('ending' in tag or '结局' in tag for tag in map(str.lower, scene.tags)):
+            parts.append(f"  (Tagged as ending)\n")
+        parts.append("\n")
     
-    return result
+    return "".join(parts)
 
 
 @tool
@@ -216,38 +195,35 @@ def get_world_facts(project: Project) -> str:
     if not facts_list:
         return "No world-building facts have been extracted yet."
     
-    result = f"World Facts ({len(facts_list)} total):\n\n"
+    parts = [f"World Facts ({len(facts_list)} total):\n\n"]
     
     # Group by category if available
-    categorized = {}
+    categorized = defaultdict(list)
     for fact in facts_list:
-        category = getattr(fact, 'category', 'General')
-        if category not in categorized:
-            categorized[category] = []
-        categorized[category].append(fact)
+        categorized[getattr(fact, 'category', 'General')].append(fact)
     
     for category, facts in sorted(categorized.items()):
         if len(categorized) > 1:
-            result += f"\n=== {category} ===\n"
+            parts.append(f"\n=== {category} ===\n")
         for fact in facts:
-            result += f"• {fact.content}\n"
+            parts.append(f"• {fact.content}\n")
             if hasattr(fact, 'source') and fact.source:
-                result += f"  (Source: Scene {fact.source})\n"
+                parts.append(f"  (Source: Scene {fact.source})\n")
     
-    return result
+    return "".join(parts)
 
 
 def create_story_tools(project: Project) -> List:
     """
-    Create a list of tools bound to the current project.
+    Create the list of story tools for the current project.
+    
+    The tools take the project as their `project` argument, so the same
+    module-level tool objects serve every project.
     
     Returns:
         List of LangChain tools ready for use with LangGraph agent
     """
-    # Create partial functions with project bound
-    from functools import partial
-    
-    tools = [
+    return [
         get_all_characters,
         get_character_by_name,
         get_all_scenes,
@@ -256,14 +232,3 @@ def create_story_tools(project: Project) -> List:
         count_endings,
         get_world_facts,
     ]
-    
-    # Bind project to each tool
-    bound_tools = []
-    for tool_func in tools:
-        # Create a wrapper that binds the project
-        bound_tool = partial(tool_func.func, project=project)
-        bound_tool.__name__ = tool_func.name
-        bound_tool.__doc__ = tool_func.description
-        bound_tools.append(tool_func)
-    
-    return bound_tools
@@ -1,9 +1,11 @@
 """
 Story-related Tools for Agent
 """
+from collections import defaultdict
 from typing import Dict, Any, List
 from .base_tool import BaseTool
 from ..models.project import Project
+from ..services.scene_index import get_scene_index
 
 
 class GetAllCharactersTool(BaseTool):
@@ -33,17 +35,17 @@ class GetAllCharactersTool(BaseTool):
         if not self.project.characters:
             return "No characters found in the story."
         
-        result = f"Total characters: {len(self.project.characters)}\n\n"
-        for char in self.project.characters:
-            aliases = f" (aka {', '.join(char.aliases)})" if char.aliases else ""
+        parts = [f"Total characters: {len(self.project.characters)}\n\n"]
+        for char in self.project.characters.values():
+            alias = f" (aka {char.alias})" if char.alias else ""
             traits = f"\nTraits: {', '.join(char.traits[:3])}" if char.traits else ""
-            result += f"• {char.name}{aliases}{traits}\n"
+            parts.append(f"• {char.name}{alias}{traits}\n")
             if char.description:
                 desc = char.description[:100] + "..." if len(char.description) > 100 else char.description
-                result += f"  Description: {desc}\n"
-            result += "\n"
+                parts.append(f"  Description: {desc}\n")
+            parts.append("\n")
         
-        return result
+        return "".join(parts)
 
 
 class GetCharacterByNameTool(BaseTool):
@@ -75,29 +77,26 @@ class GetCharacterByNameTool(BaseTool):
     
     def execute(self, name: str, **kwargs) -> str:
         """Get character by name"""
-        name_lower = name.lower()
+        char = self.project.find_character(name)
+        if char is None:
+            available = ', '.join(c.name for c in self.project.characters.values())
+            return f"Character '{name}' not found. Available characters: {available}"
         
-        for char in self.project.characters.values():
-            if (char.name.lower() == name_lower or 
-                (char.alias and char.alias.lower() == name_lower)):
-                
-                result = f"Character: {char.name}\n"
-                if char.alias:
-                    result += f"Alias: {char.alias}\n"
-                if char.description:
-                    result += f"\nDescription:\n{char.description}\n"
-                if char.traits:
-                    result += f"\nTraits: {', '.join(char.traits)}\n"
-                if char.goals:
-                    result += f"\nGoals: {', '.join(char.goals)}\n"
-                if char.relationships:
-                    result += f"\nRelationships:\n"
-                    for rel in char.relationships:
-                        result += f"  • {rel.targetName}: {rel.relationType}\n"
-                
-                return result
+        parts = [f"Character: {char.name}\n"]
+        if char.alias:
+            parts.append(f"Alias: {char.alias}\n")
+        if char.description:
+            parts.append(f"\nDescription:\n{char.description}\n")
+        if char.traits:
+            parts.append(f"\nTraits: {', '.join(char.traits)}\n")
+        if char.goals:
+            parts.append(f"\nGoals: {', '.join(char.goals)}\n")
+        if char.relationships:
+            parts.append(f"\nRelationships:\n")
+            for rel in char.relationships:
+                parts.append(f"  • {rel.targetId}: {rel.summary}\n")
         
-        return f"Character '{name}' not found. Available characters: {', '.join(c.name for c in self.project.characters)}"
+        return "".join(parts)
 
 
 class GetAllScenesTool(BaseTool):
@@ -127,27 +126,19 @@ class GetAllScenesTool(BaseTool):
         if not self.project.scenes:
             return "No scenes found in the story."
         
-        result = f"Total scenes: {len(self.project.scenes)}\n\n"
+        parts = [f"Total scenes: {len(self.project.scenes)}\n\n"]
         
-        # Group by chapter
-        chapters = {}
-        for scene in self.project.scenes.values():
-            chapter = scene.chapter or "No Chapter"
-            if chapter not in chapters:
-                chapters[chapter] = []
-            chapters[chapter].append(scene)
-        
-        for chapter, scenes in sorted(chapters.items()):
-            result += f"\n=== {chapter} ===\n"
+        for chapter, scenes in self.project.get_scenes_by_chapter().items():
+            parts.append(f"\n=== {chapter} ===\n")
             for scene in scenes:
-                result += f"\n{scene.id}. {scene.title}\n"
+                parts.append(f"\n{scene.id}. {scene.title}\n")
                 if scene.summary:
                     summary = scene.summary[:150] + "..." if len(scene.summary) > 150 else scene.summary
-                    result += f"   Summary: {summary}\n"
+                    parts.append(f"   Summary: {summary}\n")
                 if scene.tags:
-                    result += f"   Tags: {', '.join(scene.tags)}\n"
+                    parts.append(f"   Tags: {', '.join(scene.tags)}\n")
         
-        return result
+        return "".join(parts)
 
 
 class GetSceneByIdTool(BaseTool):
@@ -179,27 +170,27 @@ class GetSceneByIdTool(BaseTool):
     
     def execute(self, scene_id: str, **kwargs) -> str:
         """Get scene by ID"""
-        for scene in self.project.scenes.values():
-            if scene.id == scene_id:
-                result = f"Scene: {scene.title}\n"
-                result += f"ID: {scene.id}\n"
-                if scene.chapter:
-                    result += f"Chapter: {scene.chapter}\n"
-                if scene.summary:
-                    result += f"\nSummary:\n{scene.summary}\n"
-                if scene.body:
-                    body = scene.body[:500] + "..." if len(scene.body) > 500 else scene.body
-                    result += f"\nContent:\n{body}\n"
-                if scene.choices:
-                    result += f"\nChoices ({len(scene.choices)}):\n"
-                    for choice in scene.choices:
-                        result += f"  → {choice.text} (leads to: {choice.nextSceneId or 'None'})\n"
-                if scene.tags:
-                    result += f"\nTags: {', '.join(scene.tags)}\n"
-                
-                return result
+        scene = self.project.scenes.get(scene_id)
+        if scene is None:
+            return f"Scene with ID '{scene_id}' not found."
+        
+        parts = [f"Scene: {scene.title}\n"]
+        parts.append(f"ID: {scene.id}\n")
+        if scene.chapter:
+            parts.append(f"Chapter: {scene.chapter}\n")
+        if scene.summary:
+            parts.append(f"\nSummary:\n{scene.summary}\n")
+        if scene.body:
+            body = scene.body[:500] + "..." if len(scene.body) > 500 else scene.body
+            parts.append(f"\nContent:\n{body}\n")
+        if scene.choices:
+            parts.append(f"\nChoices ({len(scene.choices)}):\n")
+            for choice in scene.choices:
+                parts.append(f"  → {choice.text} (leads to: {choice.targetSceneId or 'None'})\n")
+        if scene.tags:
+            parts.append(f"\nTags: {', '.join(scene.tags)}\n")
         
-        return f"Scene with ID '{scene_id}' not found."
+        return "".join(parts)
 
 
 class SearchScenesTool(BaseTool):
@@ -231,30 +222,22 @@ class SearchScenesTool(BaseTool):
     
     def execute(self, keyword: str, **kwargs) -> str:
         """Search scenes by keyword"""
-        keyword_lower = keyword.lower()
-        matching_scenes = []
-        
-        for scene in self.project.scenes.values():
-            if (keyword_lower in scene.title.lower() or
-                (scene.summary and keyword_lower in scene.summary.lower()) or
-                (scene.body and keyword_lower in scene.body.lower()) or
-                any(keyword_lower in tag.lower() for tag in scene.tags)):
-                matching_scenes.append(scene)
+        matching_scenes = get_scene_index(self.project).search(keyword.lower())
         
         if not matching_scenes:
             return f"No scenes found containing keyword '{keyword}'."
         
-        result = f"Found {len(matching_scenes)} scene(s) containing '{keyword}':\n\n"
+        parts = [f"Found {len(matching_scenes)} scene(s) containing '{keyword}':\n\n"]
         for scene in matching_scenes:
-            result += f"• {scene.id}. {scene.title}\n"
+            parts.append(f"• {scene.id}. {scene.title}\n")
             if scene.chapter:
-                result += f"  Chapter: {scene.chapter}\n"
+                parts.append(f"  Chapter: {scene.chapter}\n")
             if scene.summary:
                 summary = scene.summary[:100] + "..." if len(scene.summary) > 100 else scene.summary
-                result += f"  Summary: {summary}\n"
-            result += "\n"
+                parts.append(f"  Summary: {summary}\n")
+            parts.append("\n")
         
-        return result
+        return "".join(parts)
 
 
 class CountEndingsTool(BaseTool):
@@ -269,7 +252,7 @@ class CountEndingsTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Count how many ending scenes exist in the story (scenes with no choices or outgoing connections)"
+        return "Count how many ending scenes exist in the story (scenes marked as endings, or with no outgoing connections)"
     
     @property
     def parameters(self) -> Dict[str, Any]:
@@ -281,26 +264,22 @@ class CountEndingsTool(BaseTool):
     
     def execute(self, **kwargs) -> str:
         """Count endings"""
-        endings = []
-        
-        for scene in self.project.scenes.values():
-            # A scene is an ending if it has no choices or all choices lead nowhere
-            if not scene.choices or all(not choice.nextSceneId for choice in scene.choices):
-                endings.append(scene)
+        # Endings: scenes marked isEnding, or whose choices all lead nowhere
+        endings = [self.project.scenes[scene_id] for scene_id in self.project.get_ending_ids()]
         
         if not endings:
-            return "No clear endings found in the story. All scenes have outgoing choices."
+            return "No clear endings found in the story. All scenes have outgoing choices and none is marked as an ending."
         
-        result = f"Found {len(endings)} ending(s):\n\n"
+        parts = [f"Found {len(endings)} ending(s):\n\n"]
         for scene in endings:
-            result += f"• {scene.id}. {scene.title}\n"
+            parts.append(f"• {scene.id}. {scene.title}\n")
             if scene.chapter:
-                result += f"  Chapter: {scene.chapter}\n"
-            if scene.tags and any('ending' in tag.lower() or '结局' in tag.lower() for tag in scene.tags):
-                result += f"  (Tagged as ending)\n"
-            result += "\n"
+                parts.append(f"  Chapter: {scene.chapter}\n")
+            if any('ending' in tag or '结局' in tag for tag in map(str.lower, scene.tags)):
+                parts.append(f"  (Tagged as ending)\n")
+            parts.append("\n")
         
-        return result
+        return "".join(parts)
 
 
 class GetWorldFactsTool(BaseTool):
@@ -331,22 +310,19 @@ class GetWorldFactsTool(BaseTool):
         if not facts_list:
             return "No world-building facts have been extracted yet."
         
-        result = f"World Facts ({len(facts_list)} total):\n\n"
+        parts = [f"World Facts ({len(facts_list)} total):\n\n"]
         
         # Group by category if available
-        categorized = {}
+        categorized = defaultdict(list)
         for fact in facts_list:
-            category = getattr(fact, 'category', 'General')
-            if category not in categorized:
-                categorized[category] = []
-            categorized[category].append(fact)
+            categorized[getattr(fact, 'category', 'General')].append(fact)
         
         for category, facts in sorted(categorized.items()):
             if len(categorized) > 1:
-                result += f"\n=== {category} ===\n"
+                parts.append(f"\n=== {category} ===\n")
             for fact in facts:
-                result += f"• {fact.content}\n"
+                parts.append(f"• {fact.content}\n")
                 if hasattr(fact, 'source') and fact.source:
-                    result += f"  (Source: Scene {fact.source})\n"
+                    parts.append(f"  (Source: Scene {fact.source})\n")
         
-        return result
+        return "".join(parts)
@@ -52,7 +52,7 @@ def render_ai_tools_view():
             if st.button(f"🚀 {i18n.t('ai_tools.generate_summary')}", type="primary"):
                 with st.spinner(i18n.t('ai_tools.ai_analyzing')):
                     summary = ai_service.summarize_scene(project, scene)
-                    scene.summary = summary
+                    scene_service.update_scene(project, scene.id, summary=summary)
                     
                     st.success(f"✅ {i18n.t('ai_tools.summary_generated')}")
                     st.markdown(f"**{i18n.t('ai_tools.generated_summary')}**")
@@ -41,7 +41,7 @@ def render_characters_view():
             if submitted and name:
                 character = character_service.create_character(project, name, description)
                 if alias:
-                    character.alias = alias
+                    character_service.update_character(project, character.id, alias=alias)
                 st.session_state.show_character_create = False
                 st.success(f"✅ {i18n.t('characters.character_created', name=name)}")
                 st.rerun()
@@ -87,13 +87,9 @@ def render_chat_view():
                     prompt = last_user_msg["content"]
                     
                     # Prepare history (exclude the last user message which is the current prompt)
-                    # Convert to OpenAI format
-                    history_messages = []
-                    for msg in st.session_state.chat_history[:-1]:
-                        history_messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
+                    # Pass the session dicts themselves so the agent can reuse the
+                    # LangChain messages it cached on them in earlier turns
+                    history_messages = st.session_state.chat_history[:-1]
                     
                     if DEBUG_MODE:
                         # Use hardcoded response to save tokens during development
@@ -1027,6 +1027,7 @@ def render_play_path_mode(project, scene_service, i18n):
                         steps=[ThreadStep(**step) for step in st.session_state.play_thread_steps]
                     )
                     project.threads[thread_id] = thread
+                    project.touch()
                     
                     # Save project
                     project_service = st.session_state.project_service
@@ -1059,6 +1060,7 @@ def render_play_path_mode(project, scene_service, i18n):
                 
                 if st.button("🗑️ Delete" if st.session_state.locale == "en" else "🗑️ 删除", key=f"del_thread_{thread_id}"):
                     del project.threads[thread_id]
+                    project.touch()
                     project_service = st.session_state.project_service
                     project_service.save_project()
                     st.rerun()
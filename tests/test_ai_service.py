@@ -0,0 +1,79 @@
+"""
+Tests for AIService
+
+Uses a scripted LLM client, so no provider or API key is needed.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.ai_service import AIService
+from src.services.scene_service import SceneService
+from src.models.project import Project
+
+
+class ScriptedLLMClient:
+    """Returns queued replies and records each call's task type"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def call(self, project, task_type, messages, max_tokens=1024, thinking=False, json_mode=False):
+        self.calls.append(task_type)
+        return self.replies.pop(0), {}
+
+
+def create_test_scene():
+    """Create a project with one scene"""
+    project = Project(id="test-ai", name="AI Test", locale="en")
+    scene = SceneService().create_scene(project, "Rooftop")
+    return project, scene
+
+
+def test_analyze_scene_combined_single_call():
+    """Summary and facts come from one JSON reply"""
+    project, scene = create_test_scene()
+    service = AIService()
+    service.llm_client = ScriptedLLMClient(
+        '{"summary": "They meet.", "facts": ["[Character] Chen Mo is a detective", "[Setting] It rains"]}'
+    )
+
+    result = service.analyze_scene_combined(project, scene)
+
+    assert result["summary"] == "They meet."
+    assert result["facts"] == ["Chen Mo is a detective", "It rains"]
+    assert len(service.llm_client.calls) == 1
+    categories = sorted(f.category for f in project.worldState.facts.values())
+    assert categories == ["character", "setting"]
+
+    print("✓ Combined analysis tests passed")
+
+
+def test_analyze_scene_combined_fallback():
+    """Unparseable replies fall back to the separate summary and fact calls"""
+    project, scene = create_test_scene()
+    service = AIService()
+    service.llm_client = ScriptedLLMClient("not json", "A summary", "[Plot] A virus spreads")
+
+    result = service.analyze_scene_combined(project, scene, save_to_project=False)
+
+    assert result == {"summary": "A summary", "facts": ["A virus spreads"]}
+    assert service.llm_client.calls == ["extraction", "summary", "extraction"]
+    assert not project.worldState.facts
+
+    print("✓ Combined analysis fallback tests passed")
+
+
+def run_all_tests():
+    """Run all AI service tests"""
+    print("\n=== Testing AIService ===\n")
+
+    test_analyze_scene_combined_single_call()
+    test_analyze_scene_combined_fallback()
+
+    print("\n✅ All AIService tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,60 @@
+"""
+Tests for CharacterService
+
+Validates character edits and the name lookup cache they invalidate.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.character_service import CharacterService
+from src.models.project import Project
+
+
+def test_find_character_by_name_or_alias():
+    """Lookup is case-insensitive over names and aliases"""
+    project = Project(id="test-chars", name="Character Test", locale="en")
+    service = CharacterService()
+
+    chen = service.create_character(project, "Chen Mo")
+    service.update_character(project, chen.id, alias="Detective")
+    lin = service.create_character(project, "林雪薇")
+
+    assert project.find_character("chen mo") is chen
+    assert project.find_character("DETECTIVE") is chen
+    assert project.find_character("林雪薇") is lin
+    assert project.find_character("nobody") is None
+
+    print("✓ Character lookup tests passed")
+
+
+def test_find_character_follows_edits():
+    """Renaming or deleting a character updates the cached lookup"""
+    project = Project(id="test-chars", name="Character Test", locale="en")
+    service = CharacterService()
+
+    chen = service.create_character(project, "Chen Mo")
+    assert project.find_character("Chen Mo") is chen
+
+    service.update_character(project, chen.id, name="Chen Hei")
+    assert project.find_character("Chen Mo") is None
+    assert project.find_character("chen hei") is chen
+
+    service.delete_character(project, chen.id)
+    assert project.find_character("Chen Hei") is None
+
+    print("✓ Character lookup invalidation tests passed")
+
+
+def run_all_tests():
+    """Run all character service tests"""
+    print("\n=== Testing CharacterService ===\n")
+
+    test_find_character_by_name_or_alias()
+    test_find_character_follows_edits()
+
+    print("\n✅ All CharacterService tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()
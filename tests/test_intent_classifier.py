@@ -0,0 +1,63 @@
+"""
+Tests for IntentClassifier
+
+Uses a character-histogram embedding so the tests run without the
+sentence-transformers model.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.services.intent_classifier import IntentClassifier, get_intent_classifier
+
+
+def char_embed(text: str) -> np.ndarray:
+    """Toy embedding: hashed character counts"""
+    vector = np.zeros(64, dtype=np.float32)
+    for ch in text.lower():
+        vector[ord(ch) % 64] += 1.0
+    return vector
+
+
+EXAMPLES = {
+    "qa": ["how many scenes", "how many endings", "how many characters"],
+    "chat": ["zzz brainstorm", "zzz ideas", "zzz feedback"],
+}
+
+
+def test_predict_nearest_centroid():
+    """Messages go to the closer centroid with confidence in [0.5, 1]"""
+    classifier = IntentClassifier(char_embed, EXAMPLES)
+
+    intent, confidence = classifier.predict("how many facts")
+    assert intent == "qa"
+    assert 0.5 <= confidence <= 1.0
+
+    intent, confidence = classifier.predict("zzz zzz")
+    assert intent == "chat"
+    assert confidence > 0.6
+
+    print("✓ Intent prediction tests passed")
+
+
+def test_no_classifier_without_embeddings():
+    """No classifier when the vector database is missing"""
+    assert get_intent_classifier(None) is None
+
+    print("✓ Missing embedding model tests passed")
+
+
+def run_all_tests():
+    """Run all intent classifier tests"""
+    print("\n=== Testing IntentClassifier ===\n")
+
+    test_predict_nearest_centroid()
+    test_no_classifier_without_embeddings()
+
+    print("\n✅ All IntentClassifier tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()
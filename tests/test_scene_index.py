@@ -0,0 +1,110 @@
+"""
+Tests for SceneKeywordIndex
+
+Validates that the bigram prefilter never drops a real keyword match and
+follows scene edits.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.scene_service import SceneService
+from src.services.scene_index import get_scene_index
+from src.models.project import Project
+
+
+def create_test_project():
+    """Create a project with a few scenes in mixed languages"""
+    project = Project(id="test-index", name="Index Test", locale="en")
+    service = SceneService()
+
+    station = service.create_scene(project, "Police Station")
+    service.update_scene(project, station.id, body="The detective reviews old case files.")
+    memory = service.create_scene(project, "回忆")
+    service.update_scene(project, memory.id, summary="陈墨想起了失去的记忆", tags=["Memory", "flashback"])
+    service.create_scene(project, "Rooftop")
+
+    return project, service, station, memory
+
+
+def exact_matches(project, keyword_lower):
+    """Reference result: full scan with plain substring checks"""
+    return {
+        scene.id for scene in project.scenes.values()
+        if keyword_lower in scene.title.lower()
+        or keyword_lower in (scene.summary or "").lower()
+        or keyword_lower in (scene.body or "").lower()
+        or any(keyword_lower in tag.lower() for tag in scene.tags)
+    }
+
+
+def test_candidates_superset_of_matches():
+    """Candidates always contain every exact match"""
+    project, _, station, memory = create_test_project()
+    index = get_scene_index(project)
+
+    for keyword in ["police", "case files", "记忆", "memory", "flash", "o", "", "missing"]:
+        candidates = {scene.id for scene in index.candidates(keyword)}
+        assert exact_matches(project, keyword) <= candidates, keyword
+
+    assert station.id in {s.id for s in index.candidates("detective")}
+    assert memory.id not in {s.id for s in index.candidates("detective")}
+
+    print("✓ Candidate superset tests passed")
+
+
+def test_search_matches_full_scan():
+    """search() returns exactly the scenes a full substring scan finds"""
+    project, _, _, _ = create_test_project()
+    index = get_scene_index(project)
+
+    for keyword in ["police", "case files", "记忆", "失去的记忆", "memory", "flash", "o", "missing", "\"old"]:
+        found = [scene.id for scene in index.search(keyword)]
+        assert set(found) == exact_matches(project, keyword), keyword
+        assert len(found) == len(set(found))
+
+    print("✓ Search exactness tests passed")
+
+
+def test_search_any_matches_union():
+    """search_any() returns the union of single-keyword searches, in order"""
+    project, _, station, memory = create_test_project()
+    index = get_scene_index(project)
+
+    for keywords in [["police", "记忆"], ["o", "flash"], ["missing", "case files"], ["a.b", ""], []]:
+        expected = set().union(*(exact_matches(project, k) for k in keywords if k))
+        found = [scene.id for scene in index.search_any(keywords)]
+        assert set(found) == expected, keywords
+        assert found == [sid for sid in project.scenes if sid in expected]
+
+    print("✓ Multi-keyword search tests passed")
+
+
+def test_index_rebuilt_after_edit():
+    """Editing a scene through SceneService invalidates the index"""
+    project, service, station, _ = create_test_project()
+
+    index = get_scene_index(project)
+    assert get_scene_index(project) is index
+    assert station.id not in {s.id for s in index.candidates("lighthouse")}
+
+    service.update_scene(project, station.id, summary="A lighthouse keeper calls in")
+    assert station.id in {s.id for s in get_scene_index(project).candidates("lighthouse")}
+
+    print("✓ Index invalidation tests passed")
+
+
+def run_all_tests():
+    """Run all scene index tests"""
+    print("\n=== Testing SceneKeywordIndex ===\n")
+
+    test_candidates_superset_of_matches()
+    test_search_matches_full_scan()
+    test_search_any_matches_union()
+    test_index_rebuilt_after_edit()
+
+    print("\n✅ All SceneKeywordIndex tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,126 @@
+"""
+Tests for SceneService
+
+Validates scene/choice CRUD and the derived-data caches it invalidates.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.scene_service import SceneService
+from src.models.project import Project
+
+
+def create_test_project():
+    """Create a project with a small branching graph: a -> b, a -> c"""
+    project = Project(id="test-scenes", name="Scene Test", locale="en")
+    service = SceneService()
+    
+    a = service.create_scene(project, "Start")
+    b = service.create_scene(project, "Left")
+    c = service.create_scene(project, "Right")
+    service.add_choice(project, a.id, "Go left", b.id)
+    service.add_choice(project, a.id, "Go right", c.id)
+    
+    return project, service, a, b, c
+
+
+def test_revision_bumped_on_mutation():
+    """Every SceneService mutation bumps the project revision"""
+    project, service, a, b, _ = create_test_project()
+    
+    rev = project.revision
+    service.update_scene(project, a.id, title="Beginning")
+    assert project.revision == rev + 1
+    
+    choice = service.add_choice(project, b.id, "Loop back", a.id)
+    assert project.revision == rev + 2
+    
+    service.delete_choice(project, b.id, choice.id)
+    assert project.revision == rev + 3
+    
+    print("✓ Revision bump tests passed")
+
+
+def test_ending_ids_cache_invalidation():
+    """Cached ending IDs follow choice edits"""
+    project, service, a, b, c = create_test_project()
+    
+    assert set(project.get_ending_ids()) == {b.id, c.id}
+    # Second call is served from the cache
+    assert project.get_ending_ids() is project.get_ending_ids()
+    
+    # b now leads somewhere, so it is no longer an ending
+    service.add_choice(project, b.id, "Continue", c.id)
+    assert set(project.get_ending_ids()) == {c.id}
+    
+    # Deleting c drops the choices pointing to it, so b is an ending again
+    service.delete_scene(project, c.id)
+    assert set(project.get_ending_ids()) == {b.id}
+    
+    # Scenes marked as endings count even when they have choices
+    service.update_scene(project, a.id, isEnding=True)
+    assert set(project.get_ending_ids()) == {a.id, b.id}
+    
+    print("✓ Ending cache invalidation tests passed")
+
+
+def test_scenes_by_character_index():
+    """Participant index lists each scene once and follows edits"""
+    project, service, a, b, _ = create_test_project()
+    
+    service.update_scene(project, a.id, participants=["chen", "lin", "chen"])
+    service.update_scene(project, b.id, participants=["chen"])
+    assert project.get_scenes_by_character() == {"chen": [a.id, b.id], "lin": [a.id]}
+    
+    service.update_scene(project, a.id, participants=[])
+    assert project.get_scenes_by_character() == {"chen": [b.id]}
+    
+    print("✓ Participant index tests passed")
+
+
+def test_scenes_by_chapter_index():
+    """Chapters are sorted by heading and keep project order inside"""
+    project, service, a, b, c = create_test_project()
+    
+    service.update_scene(project, a.id, chapter="Chapter 2")
+    service.update_scene(project, c.id, chapter="Chapter 1")
+    assert project.get_scenes_by_chapter() == {"Chapter 1": [c], "Chapter 2": [a], "No Chapter": [b]}
+    
+    service.update_scene(project, b.id, chapter="Chapter 2")
+    assert project.get_scenes_by_chapter() == {"Chapter 1": [c], "Chapter 2": [a, b]}
+    
+    print("✓ Chapter index tests passed")
+
+
+def test_delete_scenes_drops_incoming_choices():
+    """Deleting scenes removes only the choices that led to them"""
+    project, service, a, b, c = create_test_project()
+    service.add_choice(project, b.id, "Back", a.id)
+    service.add_choice(project, b.id, "Skip", c.id)
+    
+    assert project.get_incoming_scene_ids() == {b.id: [a.id], c.id: [a.id, b.id], a.id: [b.id]}
+    
+    service.delete_scenes(project, [c.id, a.id])
+    assert list(project.scenes) == [b.id]
+    assert b.choices == []
+    assert project.get_incoming_scene_ids() == {}
+    
+    print("✓ Scene deletion tests passed")
+
+
+def run_all_tests():
+    """Run all scene service tests"""
+    print("\n=== Testing SceneService ===\n")
+    
+    test_revision_bumped_on_mutation()
+    test_ending_ids_cache_invalidation()
+    test_scenes_by_character_index()
+    test_scenes_by_chapter_index()
+    test_delete_scenes_drops_incoming_choices()
+    
+    print("\n✅ All SceneService tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,179 @@
+"""
+Tests for StateService
+
+Validates effect replay along a thread and the per-revision state cache.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.scene_service import SceneService
+from src.services.state_service import StateService
+from src.models.project import Project
+from src.models.character import Character
+from src.models.world import Effect, StoryThread, ThreadStep
+
+
+def create_test_project():
+    """Create a two-step thread that raises a counter and changes a mood"""
+    project = Project(id="test-state", name="State Test", locale="en")
+    project.characters["alice"] = Character(id="alice", name="Alice")
+    service = SceneService()
+
+    first = service.create_scene(project, "Arrival")
+    second = service.create_scene(project, "Storm")
+    service.update_scene(project, first.id, effects=[
+        Effect(scope="world", target="world", op="add", path="vars.rain", value=1),
+    ])
+    service.update_scene(project, second.id, effects=[
+        Effect(scope="world", target="world", op="add", path="vars.rain", value=2),
+        Effect(scope="character", target="alice", op="set", path="mood", value="anxious"),
+        Effect(scope="character", target="alice", op="add", path="traits", value="wary"),
+    ])
+    project.threads["main"] = StoryThread(
+        id="main", name="Main",
+        steps=[ThreadStep(sceneId=first.id), ThreadStep(sceneId=second.id)],
+    )
+
+    return project, service, second
+
+
+def test_compute_state_replays_effects():
+    """Effects of every step up to step_index are applied in order"""
+    project, _, _ = create_test_project()
+    service = StateService()
+
+    world, chars, _ = service.compute_state(project, "main", 0)
+    assert world.vars == {"rain": 1}
+    assert chars["alice"].mood is None
+
+    world, chars, _ = service.compute_state(project, "main", 1)
+    assert world.vars == {"rain": 3}
+    assert chars["alice"].mood == "anxious"
+    assert chars["alice"].active_traits == ["wary"]
+
+    # Step 1 resumed from the cached step 0, which must be left untouched
+    assert service.compute_state(project, "main", 0)[0].vars == {"rain": 1}
+    assert service.compute_state(project, "main", 5)[0].vars == {"rain": 3}
+
+    diff = service.diff_state(project, "main", 0, 1)
+    assert diff["world"] == {"rain": (1, 3)}
+    assert diff["characters"]["alice"]["mood"] == (None, "anxious")
+
+    print("✓ State replay tests passed")
+
+
+def test_cached_states_are_copied_and_invalidated():
+    """Callers may mutate results; project edits drop cached states"""
+    project, scenes, second = create_test_project()
+    service = StateService()
+
+    world, chars, _ = service.compute_state(project, "main", 1)
+    world.vars["rain"] = 100
+    chars["alice"].active_traits.append("soaked")
+    world, chars, _ = service.compute_state(project, "main", 1)
+    assert world.vars == {"rain": 3}
+    assert chars["alice"].active_traits == ["wary"]
+
+    cached = service.compute_state(project, "main", 1, copy=False)
+    assert service.compute_state(project, "main", 1, copy=False) is cached
+
+    scenes.update_scene(project, second.id, effects=[])
+    assert service.compute_state(project, "main", 1)[0].vars == {"rain": 1}
+
+    print("✓ State cache tests passed")
+
+
+def test_concurrent_compute_state():
+    """Threads sharing one project's state cache all get correct replays"""
+    project = Project(id="test-state-threads", name="Thread Test", locale="en")
+    service = SceneService()
+    steps = []
+    for i in range(300):
+        scene = service.create_scene(project, f"Step {i}")
+        service.update_scene(project, scene.id, effects=[
+            Effect(scope="world", target="world", op="add", path="vars.count", value=1),
+        ])
+        steps.append(ThreadStep(sceneId=scene.id))
+    project.threads["main"] = StoryThread(id="main", name="Main", steps=steps)
+    state_service = StateService()
+
+    def count_at(step_index):
+        world, _, _ = state_service.compute_state(project, "main", step_index, copy=False)
+        return world.vars["count"]
+
+    # More steps than STATE_CACHE_SIZE, visited out of order, so lookups,
+    # checkpoint scans and evictions interleave; switch threads often
+    requested = [(step * 7919) % 300 for step in range(3000)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            counts = list(pool.map(count_at, requested))
+    finally:
+        sys.setswitchinterval(interval)
+    assert counts == [step + 1 for step in requested]
+
+    print("✓ Concurrent state cache tests passed")
+
+
+def test_derived_cache_with_concurrent_touch():
+    """derived() never fails or caches stale values while another thread touches"""
+    project = Project(id="test-derived-threads", name="Derived Test", locale="en")
+
+    # A factory overlapping a touch() returns its value without caching it
+    def stale_factory():
+        project.touch()
+        return "stale"
+    assert project.derived("value", stale_factory) == "stale"
+    assert project.derived("value", lambda: "fresh") == "fresh"
+
+    stop = threading.Event()
+    errors = []
+
+    def toucher():
+        while not stop.is_set():
+            project.touch()
+
+    def reader():
+        try:
+            for _ in range(2000):
+                revision = project.revision
+                value = project.derived("revision", lambda: project.revision)
+                assert value >= revision
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    touch_thread = threading.Thread(target=toucher)
+    touch_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for _ in range(4):
+                pool.submit(reader)
+    finally:
+        stop.set()
+        touch_thread.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+    print("✓ Concurrent derived cache tests passed")
+
+
+def run_all_tests():
+    """Run all state service tests"""
+    print("\n=== Testing StateService ===\n")
+
+    test_compute_state_replays_effects()
+    test_cached_states_are_copied_and_invalidated()
+    test_concurrent_compute_state()
+    test_derived_cache_with_concurrent_touch()
+
+    print("\n✅ All StateService tests passed!\n")
+
+
+if __name__ == "__main__":
+    run_all_tests()